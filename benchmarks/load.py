@@ -0,0 +1,117 @@
+"""Drives the message bus with in-memory adapters and reports throughput.
+
+    PYTHONPATH=src python benchmarks/load.py [--count N] [--pdf resume.pdf]
+        [--supervise] [--views N]
+
+Every resume is created with CreateResume, then the messages create_resume
+published through the outbox (RedactResume, AttachTextCoordinates) are handled
+like the consumer would, and finally ``--views`` keyword lookups are run
+against the in-memory read model. No Postgres, S3 or broker is needed.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from uuid import uuid4
+
+
+class ErrorCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def report(name, count, seconds, errors):
+    rate = count / seconds if seconds else float("inf")
+    print(
+        f"{name:>24} {count:>7} {seconds:>9.2f} {rate:>10.1f} {errors:>7}",
+        flush=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--pdf", default="resume.pdf")
+    parser.add_argument(
+        "--supervise",
+        action="store_true",
+        help="run PDF stages in supervised, deadline-bound children like production",
+    )
+    parser.add_argument("--views", type=int, default=1000)
+    parser.add_argument("--keywords", default="python developer")
+    args = parser.parse_args()
+
+    os.environ["PDF_SUPERVISE"] = "true" if args.supervise else "false"
+    os.environ.setdefault("RESUME_PROFILE_SAMPLE_RATE", "0")
+    os.environ["REDACTION_SHARED_ADMISSION"] = "false"
+
+    from resume import bootstrap, in_memory_views
+    from resume.adapters.broker import InMemoryBroker
+    from resume.adapters.cache import NullCache
+    from resume.adapters.file_store import InMemoryFileStore
+    from resume.domain import commands, model
+    from resume.service_layer import handlers, unit_of_work
+    from resume.service_layer.outbox import OutboxRelay
+
+    errors = ErrorCounter()
+    logging.getLogger("resume").addHandler(errors)
+    logging.getLogger("resume").setLevel(logging.WARNING)
+
+    prospect = model.Prospect(uuid=str(uuid4()), id=1)
+    uow = unit_of_work.InMemoryUnitOfWork(prospects=[prospect])
+    broker = InMemoryBroker()
+    bus = bootstrap.bootstrap(
+        start_orm=False,
+        uow=uow,
+        cache=NullCache(),
+        file_store=InMemoryFileStore(),
+    )
+    with open(args.pdf, "rb") as f:
+        blob = f.read()
+
+    print(f"{'phase':>24} {'count':>7} {'seconds':>9} {'per sec':>10} {'errors':>7}")
+
+    uuids = [str(uuid4()) for _ in range(args.count)]
+    started_at = time.perf_counter()
+    for uuid in uuids:
+        bus.handle(
+            commands.CreateResume(
+                prospect_uuid=prospect.uuid, uuid=uuid, resume_bytes=blob
+            )
+        )
+    report("CreateResume", args.count, time.perf_counter() - started_at, errors.count)
+
+    OutboxRelay(uow, broker).relay_pending()
+    published, broker.published = broker.published, []
+    for topic, command_class in handlers.TOPIC_COMMANDS.items():
+        messages = [payload for name, payload in published if name == topic]
+        errors.count = 0
+        started_at = time.perf_counter()
+        for payload in messages:
+            bus.handle(command_class(**payload))
+        report(
+            command_class.__name__,
+            len(messages),
+            time.perf_counter() - started_at,
+            errors.count,
+        )
+
+    errors.count = 0
+    started_at = time.perf_counter()
+    for i in range(args.views):
+        in_memory_views.get_resume(uow, uuids[i % len(uuids)], keywords=args.keywords)
+    report("get_resume", args.views, time.perf_counter() - started_at, errors.count)
+
+    started_at = time.perf_counter()
+    for _ in range(args.views):
+        in_memory_views.search_resumes(uow, args.keywords, limit=20)
+    report("search_resumes", args.views, time.perf_counter() - started_at, errors.count)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
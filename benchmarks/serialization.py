@@ -0,0 +1,53 @@
+"""Compare the marshmallow and compact serializers for GET /resumes/<uuid>.
+
+    PYTHONPATH=src python benchmarks/serialization.py [n_coordinates ...]
+"""
+import json
+import random
+import sys
+import timeit
+
+from resume.adapters import schemas
+
+
+def make_resume(n_coordinates: int) -> dict:
+    rng = random.Random(0)
+    return dict(
+        uuid="00000000-0000-0000-0000-000000000000",
+        link="https://example.com/resume.pdf",
+        width=612,
+        height=792,
+        text_coordinates=[
+            dict(
+                text=f"word{i}",
+                x0=rng.uniform(0, 612),
+                x1=rng.uniform(0, 612),
+                y0=rng.uniform(0, 792),
+                y1=rng.uniform(0, 792),
+            )
+            for i in range(n_coordinates)
+        ],
+    )
+
+
+def full(resume):
+    return json.dumps({"data": schemas.Resume().dump(resume)})
+
+
+def compact(resume):
+    return json.dumps({"data": schemas.dump_compact_resume(resume)})
+
+
+def main(sizes):
+    print(f"{'coords':>8} {'format':>8} {'bytes':>10} {'ms/response':>12}")
+    for n in sizes:
+        resume = make_resume(n)
+        for name, serialize in (("full", full), ("compact", compact)):
+            number = max(1, 20000 // max(n, 1))
+            seconds = timeit.timeit(lambda: serialize(resume), number=number)
+            size = len(serialize(resume).encode())
+            print(f"{n:>8} {name:>8} {size:>10} {seconds / number * 1000:>12.3f}")
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10, 100, 500, 2000])
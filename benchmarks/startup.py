@@ -0,0 +1,56 @@
+"""Import-time profile of the web entry point, based on ``python -X importtime``.
+
+    PYTHONPATH=src python benchmarks/startup.py [module] [--top N]
+
+Prints the cumulative import time of ``module`` (default
+``resume.entry_points.flask_app``), the slowest imports beneath it, and
+whether any of the PDF/NER dependencies were imported at all.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ("fitz", "pymupdf", "pdfminer", "scrubadub", "scrubadub_stanford", "nltk")
+
+
+def importtime(module: str):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=os.environ,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return result.returncode, result.stderr, rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("module", nargs="?", default="resume.entry_points.flask_app")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    returncode, stderr, rows = importtime(args.module)
+    if returncode != 0:
+        print(stderr.splitlines()[-1] if stderr else "import failed")
+        sys.exit(returncode)
+
+    total = next(cum for cum, _, name in rows if name.strip() == args.module)
+    print(f"import {args.module}: {total / 1000:.1f} ms")
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[: args.top]:
+        print(f"{cumulative / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+    imported = {name.strip().split(".")[0] for _, _, name in rows}
+    heavy = sorted(imported.intersection(HEAVY_MODULES))
+    print(f"heavy dependencies imported: {', '.join(heavy) if heavy else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Highlight query plans and latency, flat vs hash-partitioned text_coordinates.
+
+    BENCH_POSTGRES_URI=postgresql://... PYTHONPATH=src \\
+        python benchmarks/text_coordinates.py [--rows 10000000] [--queries 200]
+
+Builds both layouts in a scratch ``bench_text_coordinates`` schema (dropped
+first, so rerunning starts over): "flat" is the old table with only the GIN on
+tsv, "partitioned" is migrations/0001_partition_text_coordinates.sql. Then runs
+the highlight queries of views.get_resume (one resume) and views.get_resumes /
+search_resumes (a page of resumes) against random resumes, printing one plan
+and the p50/p95 latency of each.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from resume.adapters.orm import TEXT_COORDINATES_PARTITIONS
+
+SCHEMA = "bench_text_coordinates"
+WORDS = (
+    "python java sql manager developer engineer sales marketing finance "
+    "accounting design research teaching nursing analyst assistant executive "
+    "support operations logistics"
+).split()
+
+COLUMNS = """
+    id BIGINT NOT NULL,
+    text VARCHAR NOT NULL,
+    tsv TSVECTOR,
+    x0 REAL NOT NULL,
+    x1 REAL NOT NULL,
+    y0 REAL NOT NULL,
+    y1 REAL NOT NULL,
+    redacted BOOLEAN DEFAULT false,
+    resume_id INTEGER NOT NULL
+"""
+
+LAYOUTS = {
+    "flat": [
+        f"CREATE TABLE flat ({COLUMNS}, PRIMARY KEY (id))",
+        "CREATE INDEX ON flat USING gin (tsv)",
+    ],
+    "partitioned": [
+        f"CREATE TABLE partitioned ({COLUMNS}, PRIMARY KEY (id, resume_id))"
+        " PARTITION BY HASH (resume_id)",
+        *[
+            f"CREATE TABLE partitioned_p{remainder} PARTITION OF partitioned"
+            f" FOR VALUES WITH (MODULUS {TEXT_COORDINATES_PARTITIONS},"
+            f" REMAINDER {remainder})"
+            for remainder in range(TEXT_COORDINATES_PARTITIONS)
+        ],
+        "CREATE INDEX ON partitioned (resume_id, redacted)"
+        " INCLUDE (text, x0, x1, y0, y1)",
+        "CREATE INDEX ON partitioned USING gin (resume_id, tsv)",
+    ],
+}
+
+ONE_RESUME = """
+SELECT text, x0, x1, y0, y1 FROM {table}
+WHERE resume_id = :resume_id AND tsv @@ to_tsquery('english', :keywords)
+"""
+
+PAGE_OF_RESUMES = """
+SELECT resume_id, text, x0, x1, y0, y1 FROM {table}
+WHERE resume_id = ANY(:resume_ids)
+AND coalesce(redacted, false) = false
+AND tsv @@ to_tsquery('english', :keywords)
+"""
+
+
+def populate(connection, table: str, rows: int, rows_per_resume: int):
+    # the words are picked by row number, so both layouts get the same rows
+    connection.execute(
+        text(
+            f"""
+            INSERT INTO {table} (id, text, tsv, x0, x1, y0, y1, resume_id)
+            SELECT
+            i,
+            word,
+            to_tsvector('english', word),
+            random() * 600, random() * 600, random() * 800, random() * 800,
+            i / :rows_per_resume + 1
+            FROM generate_series(0, :rows - 1) i,
+            LATERAL (
+                SELECT (:words)[(i * 7919 % array_length(:words, 1)) + 1] AS word
+            ) words
+            """
+        ),
+        dict(rows=rows, rows_per_resume=rows_per_resume, words=list(WORDS)),
+    )
+    connection.execute(text(f"ANALYZE {table}"))
+
+
+def measure(connection, query: str, params: list):
+    plan = connection.execute(
+        text("EXPLAIN (ANALYZE, BUFFERS) " + query), params[0]
+    ).scalars()
+    samples = []
+    for param in params:
+        started_at = time.perf_counter()
+        connection.execute(text(query), param).all()
+        samples.append((time.perf_counter() - started_at) * 1000)
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95)]
+    return "\n".join(plan), statistics.median(samples), p95
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default=os.environ.get("BENCH_POSTGRES_URI"))
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--rows-per-resume", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--keywords", default="python|manager")
+    parser.add_argument("--skip-populate", action="store_true")
+    args = parser.parse_args()
+    if not args.uri:
+        parser.error("pass --uri or set BENCH_POSTGRES_URI")
+
+    engine = create_engine(args.uri)
+    resumes = args.rows // args.rows_per_resume
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gin"))
+        if not args.skip_populate:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        connection.execute(text(f"SET search_path TO {SCHEMA}, public"))
+        if not args.skip_populate:
+            for table, statements in LAYOUTS.items():
+                started_at = time.perf_counter()
+                for statement in statements:
+                    connection.execute(text(statement))
+                populate(connection, table, args.rows, args.rows_per_resume)
+                seconds = time.perf_counter() - started_at
+                print(f"{table}: loaded {args.rows} rows in {seconds:.0f}s")
+
+    rng = random.Random(0)
+    one = [
+        dict(resume_id=rng.randint(1, resumes), keywords=args.keywords)
+        for _ in range(args.queries)
+    ]
+    page = [
+        dict(
+            resume_ids=[rng.randint(1, resumes) for _ in range(args.page_size)],
+            keywords=args.keywords,
+        )
+        for _ in range(args.queries)
+    ]
+    results = []
+    with engine.connect() as connection:
+        connection.execute(text(f"SET search_path TO {SCHEMA}, public"))
+        for table in LAYOUTS:
+            for name, query, params in (
+                ("one resume", ONE_RESUME, one),
+                ("page of resumes", PAGE_OF_RESUMES, page),
+            ):
+                plan, p50, p95 = measure(connection, query.format(table=table), params)
+                print(f"\n-- {table}, {name}\n{plan}")
+                results.append((table, name, p50, p95))
+
+    print(f"\n{'layout':>12} {'query':>16} {'p50 ms':>8} {'p95 ms':>8}")
+    for table, name, p50, p95 in results:
+        print(f"{table:>12} {name:>16} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
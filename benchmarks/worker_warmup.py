@@ -0,0 +1,113 @@
+"""First-request latency and per-worker memory, cold vs pre-forked warm workers.
+
+    PYTHONPATH=src python benchmarks/worker_warmup.py [resume.pdf] [repeat]
+
+"cold" runs the pipeline first thing in a fresh interpreter; "warm" runs it in
+a child forked after resume.entry_points.worker.warm(). Private memory is the
+part of the worker's RSS not shared with any other process. Medians of
+``repeat`` runs are reported.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+PIPELINE = """
+import time
+from resume.domain import model, redaction
+
+def run(blob):
+    started_at = time.perf_counter()
+    model.Resume.from_bytes(bytes=blob)
+    model.find_text_coordinates(blob)
+    model.redact_pdf(
+        blob,
+        [
+            redaction.Top30Percent(),
+            redaction.Bottom10Percent(),
+            redaction.ImageRedactor(),
+            redaction.LinkRedactor(),
+            redaction.MetadataRedactor(),
+        ],
+        return_result=True,
+    )
+    return time.perf_counter() - started_at
+"""
+
+
+def private_memory_mb() -> float:
+    private = 0
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                private += int(line.split()[1])
+    return private / 1024
+
+
+def cold(path, repeat):
+    code = (
+        PIPELINE
+        + f"""
+import sys
+sys.path.insert(0, {os.path.dirname(__file__)!r})
+from worker_warmup import private_memory_mb
+blob = open({path!r}, "rb").read()
+print(run(blob), private_memory_mb())
+"""
+    )
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        seconds, private = out.stdout.splitlines()[-1].split()
+        samples.append((float(seconds), float(private)))
+    return _median(samples)
+
+
+def warm(path, repeat):
+    from resume.entry_points import worker
+
+    namespace = {}
+    exec(PIPELINE, namespace)
+    worker.warm(worker.get_worker_config()["preload_cmaps"])
+    blob = open(path, "rb").read()
+
+    samples = []
+    for _ in range(repeat):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            seconds = namespace["run"](blob)
+            os.write(write_fd, f"{seconds} {private_memory_mb()}".encode())
+            os._exit(0)
+        os.close(write_fd)
+        seconds, private = os.read(read_fd, 1024).decode().split()
+        os.waitpid(pid, 0)
+        samples.append((float(seconds), float(private)))
+    return _median(samples)
+
+
+def _median(samples):
+    return (
+        statistics.median(seconds for seconds, _ in samples),
+        statistics.median(private for _, private in samples),
+    )
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "resume.pdf"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    cold_seconds, cold_private = cold(path, repeat)
+    warm_seconds, warm_private = warm(path, repeat)
+    print(f"{'':>6} {'first request ms':>17} {'private MB':>11}")
+    print(f"{'cold':>6} {cold_seconds * 1000:>17.1f} {cold_private:>11.1f}")
+    print(f"{'warm':>6} {warm_seconds * 1000:>17.1f} {warm_private:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
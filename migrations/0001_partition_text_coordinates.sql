@@ -0,0 +1,71 @@
+-- Hash partitions text_coordinates by resume_id and replaces the corpus-wide
+-- GIN on tsv with per-resume indexes:
+--
+--   ix_text_coordinates_resume_id      btree (resume_id, redacted) INCLUDE the
+--                                      highlight columns, for listing and
+--                                      replacing a resume's coordinates
+--   ix_text_coordinates_resume_id_tsv  btree_gin (resume_id, tsv), for the
+--                                      keyword highlights of one resume
+--
+-- Needs PostgreSQL 13+ (row triggers on partitioned tables). The table is
+-- copied, so run it in a maintenance window; rows without a resume_id were
+-- unreachable and are not carried over. The partition count must match
+-- orm.TEXT_COORDINATES_PARTITIONS.
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+ALTER TABLE text_coordinates RENAME TO text_coordinates_unpartitioned;
+ALTER INDEX ix_text_coordinates_tsv RENAME TO ix_text_coordinates_unpartitioned_tsv;
+DROP TRIGGER text_coordinate_tsv_update ON text_coordinates_unpartitioned;
+
+CREATE TABLE text_coordinates (
+    id INTEGER NOT NULL DEFAULT nextval('text_coordinates_id_seq'),
+    text VARCHAR NOT NULL,
+    tsv TSVECTOR,
+    x0 REAL NOT NULL,
+    x1 REAL NOT NULL,
+    y0 REAL NOT NULL,
+    y1 REAL NOT NULL,
+    redacted BOOLEAN DEFAULT false,
+    resume_id INTEGER NOT NULL REFERENCES resume (id) ON DELETE CASCADE,
+    PRIMARY KEY (id, resume_id)
+) PARTITION BY HASH (resume_id);
+
+DO $$
+BEGIN
+    FOR remainder IN 0..15 LOOP
+        EXECUTE format(
+            'CREATE TABLE text_coordinates_p%s PARTITION OF text_coordinates '
+            'FOR VALUES WITH (MODULUS 16, REMAINDER %s)',
+            remainder,
+            remainder
+        );
+    END LOOP;
+END
+$$;
+
+ALTER SEQUENCE text_coordinates_id_seq OWNED BY text_coordinates.id;
+
+-- tsv is copied as is, the trigger and indexes are only added afterwards so
+-- the copy doesn't recompute or index row by row
+INSERT INTO text_coordinates (id, text, tsv, x0, x1, y0, y1, redacted, resume_id)
+SELECT id, text, tsv, x0, x1, y0, y1, redacted, resume_id
+FROM text_coordinates_unpartitioned
+WHERE resume_id IS NOT NULL;
+
+CREATE INDEX ix_text_coordinates_resume_id
+    ON text_coordinates (resume_id, redacted) INCLUDE (text, x0, x1, y0, y1);
+CREATE INDEX ix_text_coordinates_resume_id_tsv
+    ON text_coordinates USING gin (resume_id, tsv);
+
+CREATE TRIGGER text_coordinate_tsv_update BEFORE INSERT OR UPDATE
+ON text_coordinates FOR EACH ROW EXECUTE PROCEDURE
+tsvector_update_trigger(tsv, 'pg_catalog.english', text);
+
+DROP TABLE text_coordinates_unpartitioned;
+
+COMMIT;
+
+ANALYZE text_coordinates;
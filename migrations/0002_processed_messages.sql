@@ -0,0 +1,7 @@
+-- Idempotency keys of the commands the message bus has handled, checked
+-- before dispatching a command so redeliveries are skipped.
+
+CREATE TABLE IF NOT EXISTS processed_messages (
+    key VARCHAR PRIMARY KEY,
+    processed_at TIMESTAMP NOT NULL DEFAULT now()
+);
@@ -0,0 +1,4 @@
+-- Links of the rendered previews of the redacted document, by width:
+-- {"640": ["<page 0 link>", "<page 1 link>", ...], ...}
+
+ALTER TABLE resume ADD COLUMN IF NOT EXISTS preview_links JSONB;
@@ -0,0 +1,5 @@
+-- Set when redacting the resume failed, e.g. the PDF breached its resource
+-- limits or a stage its deadline; a redelivered RedactResume retries it.
+
+ALTER TABLE resume
+    ADD COLUMN IF NOT EXISTS redaction_failed BOOLEAN DEFAULT false;
@@ -0,0 +1,9 @@
+-- Token buckets shared by every worker; the "resume.redaction" row limits
+-- the backfill rate across processes (adapters/admission.py). Redaction
+-- slots are advisory locks and need no table.
+
+CREATE TABLE IF NOT EXISTS rate_limits (
+    name VARCHAR PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    refilled_at TIMESTAMP NOT NULL
+);
@@ -0,0 +1,14 @@
+-- Messages written in the same transaction as the resume they are about,
+-- published and marked by the outbox relay. The partial index only holds
+-- the unpublished rows the relay scans.
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id SERIAL PRIMARY KEY,
+    topic VARCHAR NOT NULL,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    published_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_outbox_unpublished
+    ON outbox (id) WHERE published_at IS NULL;
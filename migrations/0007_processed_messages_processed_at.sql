@@ -0,0 +1,5 @@
+-- Processed message keys are pruned by age once they are past any
+-- redelivery, see handlers.prune_processed_messages.
+
+CREATE INDEX IF NOT EXISTS ix_processed_messages_processed_at
+    ON processed_messages (processed_at);
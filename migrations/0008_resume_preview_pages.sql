@@ -0,0 +1,5 @@
+-- The pages the previews were rendered from, in fitz points (crop box,
+-- rotated), and the matrix taking text coordinates onto them:
+-- [{"width": 595.5, "height": 842.25, "matrix": [a, b, c, d, e, f]}, ...]
+
+ALTER TABLE resume ADD COLUMN IF NOT EXISTS preview_pages JSONB;
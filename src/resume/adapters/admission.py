@@ -0,0 +1,282 @@
+import abc
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import text
+
+from resume.domain import commands
+
+
+class AbstractAdmission(abc.ABC):
+    """Redaction slots and the backfill rate, as seen by the scheduler.
+
+    Interactive work may take any of ``capacity`` slots, backfill only the
+    ones not reserved for interactive work, and only with a token of the
+    ``backfill_per_minute`` bucket. Calls are serialized by the scheduler.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 4,
+        reserved_interactive: int = 1,
+        backfill_per_minute: float = 60,
+    ):
+        self.capacity = capacity
+        self.reserved_interactive = min(reserved_interactive, capacity)
+        self.backfill_per_minute = backfill_per_minute
+
+    def slots(self, priority: str) -> range:
+        if priority == commands.INTERACTIVE:
+            return range(self.capacity)
+        return range(self.reserved_interactive, self.capacity)
+
+    @abc.abstractmethod
+    def acquire(self, priority: str):
+        """Returns a lease to ``release`` later, or None if not admitted now."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def release(self, lease):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def ready(self, priority: str) -> bool:
+        """Whether ``acquire`` would admit now, without taking anything."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def retry_in(self, priority: str) -> Optional[float]:
+        """Seconds until a refused ``acquire`` is worth retrying, None to wait
+        until the scheduler releases a slot."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def metrics(self) -> dict:
+        raise NotImplementedError
+
+
+class InMemoryAdmission(AbstractAdmission):
+    """Slots and tokens counted in this process only."""
+
+    def __init__(
+        self,
+        capacity: int = 4,
+        reserved_interactive: int = 1,
+        backfill_per_minute: float = 60,
+        clock=time.monotonic,
+    ):
+        super().__init__(capacity, reserved_interactive, backfill_per_minute)
+        self.clock = clock
+        self.running = set()
+        self._tokens = 1.0
+        self._refilled_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(
+            1.0, self._tokens + (now - self._refilled_at) * self.backfill_per_minute / 60
+        )
+        self._refilled_at = now
+
+    def _free_slot(self, priority):
+        return next(
+            (slot for slot in self.slots(priority) if slot not in self.running), None
+        )
+
+    def ready(self, priority):
+        if self._free_slot(priority) is None:
+            return False
+        if priority == commands.BACKFILL:
+            self._refill()
+            return self._tokens >= 1.0
+        return True
+
+    def acquire(self, priority):
+        if not self.ready(priority):
+            return None
+        slot = self._free_slot(priority)
+        if priority == commands.BACKFILL:
+            self._tokens -= 1.0
+        self.running.add(slot)
+        return slot
+
+    def release(self, lease):
+        self.running.discard(lease)
+
+    def retry_in(self, priority):
+        if priority != commands.BACKFILL or self._free_slot(priority) is None:
+            # only a release frees a slot
+            return None
+        if self.backfill_per_minute <= 0:
+            return None
+        return (1.0 - self._tokens) * 60 / self.backfill_per_minute
+
+    def metrics(self):
+        self._refill()
+        return dict(
+            capacity=self.capacity, running=len(self.running), tokens=self._tokens
+        )
+
+
+class PostgresAdmission(AbstractAdmission):
+    """Slots and tokens shared by every process using the same database.
+
+    A slot is a session-level advisory lock held on its own connection for as
+    long as the work runs, so a crashed worker's slots are freed with its
+    connections. The backfill bucket is a ``rate_limits`` row refilled and
+    spent in one UPDATE. Releases in other processes are not notified, a
+    refused ``acquire`` is retried every ``poll_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        engine_factory: Callable,
+        capacity: int = 4,
+        reserved_interactive: int = 1,
+        backfill_per_minute: float = 60,
+        name: str = "resume.redaction",
+        lock_base: int = 0x7265_6461_0000,
+        poll_interval: float = 1.0,
+    ):
+        super().__init__(capacity, reserved_interactive, backfill_per_minute)
+        self.engine_factory = engine_factory
+        self.name = name
+        self.lock_base = lock_base
+        self.poll_interval = poll_interval
+
+    def _connect(self):
+        # every statement commits by itself, the locks outlive transactions
+        return (
+            self.engine_factory()
+            .connect()
+            .execution_options(isolation_level="AUTOCOMMIT")
+        )
+
+    def _try_lock(self, connection, slot) -> bool:
+        return connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"),
+            dict(key=self.lock_base + slot),
+        ).scalar()
+
+    def _unlock(self, connection, slot):
+        connection.execute(
+            text("SELECT pg_advisory_unlock(:key)"), dict(key=self.lock_base + slot)
+        )
+
+    def _tokens_sql(self) -> str:
+        return """
+            least(
+                1.0,
+                "rate_limits".tokens + :per_second
+                * extract(epoch FROM clock_timestamp() - "rate_limits".refilled_at)
+            )
+        """
+
+    def _ensure_bucket(self, connection):
+        connection.execute(
+            text(
+                """
+                INSERT INTO "rate_limits" (name, tokens, refilled_at)
+                VALUES (:name, 1.0, clock_timestamp())
+                ON CONFLICT (name) DO NOTHING
+                """
+            ),
+            dict(name=self.name),
+        )
+
+    def _take_token(self, connection) -> bool:
+        self._ensure_bucket(connection)
+        return (
+            connection.execute(
+                text(
+                    f"""
+                    UPDATE "rate_limits"
+                    SET tokens = {self._tokens_sql()} - 1.0,
+                    refilled_at = clock_timestamp()
+                    WHERE "rate_limits".name = :name
+                    AND {self._tokens_sql()} >= 1.0
+                    RETURNING "rate_limits".tokens
+                    """
+                ),
+                dict(name=self.name, per_second=self.backfill_per_minute / 60),
+            ).first()
+            is not None
+        )
+
+    def _peek_tokens(self, connection) -> float:
+        self._ensure_bucket(connection)
+        return connection.execute(
+            text(
+                f"""
+                SELECT {self._tokens_sql()} FROM "rate_limits"
+                WHERE "rate_limits".name = :name
+                """
+            ),
+            dict(name=self.name, per_second=self.backfill_per_minute / 60),
+        ).scalar()
+
+    def _discard(self, connection):
+        # never pool a connection that may still hold a lock
+        connection.invalidate()
+        connection.close()
+
+    def acquire(self, priority):
+        connection = self._connect()
+        try:
+            for slot in self.slots(priority):
+                if not self._try_lock(connection, slot):
+                    continue
+                if priority == commands.BACKFILL and not self._take_token(connection):
+                    self._unlock(connection, slot)
+                    break
+                return connection, slot
+        except Exception:
+            self._discard(connection)
+            raise
+        connection.close()
+        return None
+
+    def release(self, lease):
+        connection, slot = lease
+        try:
+            self._unlock(connection, slot)
+        except Exception:
+            self._discard(connection)
+            raise
+        connection.close()
+
+    def ready(self, priority):
+        connection = self._connect()
+        ready = False
+        try:
+            if priority != commands.BACKFILL or self._peek_tokens(connection) >= 1.0:
+                # a slot is free if its lock can be taken, it is dropped again
+                for slot in self.slots(priority):
+                    if self._try_lock(connection, slot):
+                        self._unlock(connection, slot)
+                        ready = True
+                        break
+        except Exception:
+            self._discard(connection)
+            raise
+        connection.close()
+        return ready
+
+    def retry_in(self, priority):
+        return self.poll_interval
+
+    def metrics(self):
+        with self._connect() as connection:
+            running = connection.execute(
+                text(
+                    """
+                    SELECT count(*) FROM pg_locks
+                    WHERE locktype = 'advisory' AND granted AND objsubid = 1
+                    AND ((classid::bigint << 32) | objid::bigint)
+                        BETWEEN :first AND :last
+                    """
+                ),
+                dict(first=self.lock_base, last=self.lock_base + self.capacity - 1),
+            ).scalar()
+            tokens = self._peek_tokens(connection)
+        return dict(capacity=self.capacity, running=running, tokens=tokens)
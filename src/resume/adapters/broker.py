@@ -0,0 +1,173 @@
+import abc
+import functools
+import json
+import logging
+import os
+import threading
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Message = Tuple[str, dict]
+
+
+class UnroutableMessages(Exception):
+    pass
+
+
+class AbstractBroker(abc.ABC):
+    @abc.abstractmethod
+    def publish_batch(self, messages: List[Message]):
+        """Publishes every message or raises; returning means all were confirmed."""
+        raise NotImplementedError
+
+
+class RabbitMQBroker(AbstractBroker):
+    """Publishes to a topic exchange, routed by topic, one transaction a batch.
+
+    pika's blocking channel waits for every publisher confirm on its own, so
+    a batch is published in an AMQP transaction instead: one commit round trip
+    for the whole batch, and once it returned the broker holds every message.
+    Unroutable (mandatory) messages come back before the commit's ok and fail
+    the batch.
+    """
+
+    def __init__(self, url: str, exchange: str):
+        self.url = url
+        self.exchange = exchange
+        self._channel = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._returned = []
+
+    def _on_return(self, channel, method, properties, body):
+        self._returned.append(method.routing_key)
+
+    def _connect(self):
+        import pika
+
+        # a channel is never shared with a forked child
+        if (
+            self._channel is None
+            or self._channel.is_closed
+            or self._pid != os.getpid()
+        ):
+            connection = pika.BlockingConnection(pika.URLParameters(self.url))
+            channel = connection.channel()
+            channel.exchange_declare(
+                exchange=self.exchange, exchange_type="topic", durable=True
+            )
+            channel.add_on_return_callback(self._on_return)
+            channel.tx_select()
+            self._returned = []
+            self._channel = channel
+            self._pid = os.getpid()
+        return self._channel
+
+    def _disconnect(self):
+        channel, self._channel = self._channel, None
+        try:
+            channel.connection.close()
+        except Exception:
+            pass
+
+    def publish_batch(self, messages):
+        import pika
+
+        properties = pika.BasicProperties(
+            content_type="application/json", delivery_mode=2
+        )
+        with self._lock:
+            channel = self._connect()
+            try:
+                for topic, payload in messages:
+                    channel.basic_publish(
+                        exchange=self.exchange,
+                        routing_key=topic,
+                        body=json.dumps(payload),
+                        properties=properties,
+                        mandatory=True,
+                    )
+                channel.tx_commit()
+                # dispatches the returns received before the commit's ok
+                channel.connection.process_data_events(time_limit=0)
+                if self._returned:
+                    raise UnroutableMessages(self._returned)
+            except Exception:
+                # reconnect on the next batch, the unconfirmed rows are retried
+                self._disconnect()
+                raise
+
+    def consume(self, topics: List[str], handle: Callable, prefetch_count: int = 1):
+        """Calls ``handle(topic, payload)`` for every message of ``topics`` until
+        the connection fails, acking each one once ``handle`` returned.
+
+        A message ``handle`` raised on is requeued once, and dead-lettered to
+        the ``<topic>.dead`` queue when it fails again.
+
+        Messages are handled on the connection's thread, so heartbeats stop
+        meanwhile; RABBITMQ_URL needs a ``heartbeat`` above the longest stage
+        deadline.
+        """
+        import pika
+
+        connection = pika.BlockingConnection(pika.URLParameters(self.url))
+        channel = connection.channel()
+        channel.exchange_declare(
+            exchange=self.exchange, exchange_type="topic", durable=True
+        )
+        dead_letter_exchange = f"{self.exchange}.dead"
+        channel.exchange_declare(
+            exchange=dead_letter_exchange, exchange_type="topic", durable=True
+        )
+        channel.basic_qos(prefetch_count=prefetch_count)
+        for topic in topics:
+            channel.queue_declare(queue=f"{topic}.dead", durable=True)
+            channel.queue_bind(
+                queue=f"{topic}.dead", exchange=dead_letter_exchange, routing_key=topic
+            )
+            channel.queue_declare(
+                queue=topic,
+                durable=True,
+                arguments={"x-dead-letter-exchange": dead_letter_exchange},
+            )
+            channel.queue_bind(queue=topic, exchange=self.exchange, routing_key=topic)
+            channel.basic_consume(
+                queue=topic,
+                on_message_callback=functools.partial(self._on_message, handle),
+            )
+        try:
+            channel.start_consuming()
+        finally:
+            if connection.is_open:
+                connection.close()
+
+    @staticmethod
+    def _on_message(handle, channel, method, properties, body):
+        try:
+            handle(method.routing_key, json.loads(body))
+        except Exception:
+            logger.exception(
+                "Exception handling %s message, %s",
+                method.routing_key,
+                "dead-lettered" if method.redelivered else "requeued",
+            )
+            channel.basic_nack(
+                delivery_tag=method.delivery_tag, requeue=not method.redelivered
+            )
+            return
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+
+
+class InMemoryBroker(AbstractBroker):
+    def __init__(self):
+        self.published = []
+
+    def publish_batch(self, messages):
+        self.published.extend(messages)
+
+
+def from_config(config: dict) -> Optional[AbstractBroker]:
+    if not config["url"]:
+        return None
+    return RabbitMQBroker(config["url"], config["exchange"])
@@ -0,0 +1,205 @@
+import abc
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class AbstractCache(abc.ABC):
+    """Response cache keyed on a resume uuid plus a per-request field.
+
+    Entries for one resume can be dropped together with ``invalidate``, which
+    every handler changing what they were built from calls after its commit.
+    ``get_or_load`` doesn't store a value loaded while such an invalidation
+    ran, so an entry built from the state before a write is never kept.
+    """
+
+    @abc.abstractmethod
+    def get(self, uuid: str, field: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, uuid: str, field: str, value: dict):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def invalidate(self, uuid: str):
+        raise NotImplementedError
+
+    def get_or_load(
+        self, uuid: str, field: str, load: Callable[[], Optional[dict]]
+    ) -> Optional[dict]:
+        value = self.get(uuid, field)
+        if value is None:
+            value = load()
+            if value is not None:
+                self.set(uuid, field, value)
+        return value
+
+
+class NullCache(AbstractCache):
+    def get(self, uuid, field):
+        return None
+
+    def set(self, uuid, field, value):
+        pass
+
+    def invalidate(self, uuid):
+        pass
+
+
+class LRUCache(AbstractCache):
+    def __init__(self, max_size: int = 1024, ttl: float = 60, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._fields = {}
+        self._lock = threading.Lock()
+        # bumped by every invalidation, a load overlapping one isn't stored
+        self._generation = 0
+
+    def get(self, uuid, field):
+        key = (uuid, field)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < self.clock():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, uuid, field, value):
+        key = (uuid, field)
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._fields.setdefault(uuid, set()).add(field)
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, uuid):
+        with self._lock:
+            self._generation += 1
+            for field in self._fields.pop(uuid, set()):
+                self._entries.pop((uuid, field), None)
+
+    def get_or_load(self, uuid, field, load):
+        value = self.get(uuid, field)
+        if value is not None:
+            return value
+        with self._lock:
+            generation = self._generation
+        value = load()
+        if value is not None:
+            with self._lock:
+                if generation != self._generation:
+                    return value
+            self.set(uuid, field, value)
+        return value
+
+    def _pop(self, key):
+        self._entries.pop(key, None)
+        uuid, field = key
+        fields = self._fields.get(uuid)
+        if fields is not None:
+            fields.discard(field)
+            if not fields:
+                del self._fields[uuid]
+
+
+class RedisCache(AbstractCache):
+    """One hash per resume, shared by every process.
+
+    The hash also holds a generation, bumped by ``invalidate`` in the same
+    script that drops the entries; a loaded value is only stored if the
+    generation is still the one read with the miss.
+    """
+
+    GENERATION = "@generation"
+
+    _INVALIDATE = """
+        local generation = redis.call('HGET', KEYS[1], ARGV[1])
+        redis.call('DEL', KEYS[1])
+        redis.call('HSET', KEYS[1], ARGV[1], (tonumber(generation) or 0) + 1)
+        redis.call('EXPIRE', KEYS[1], ARGV[2])
+    """
+    _SET_IF_GENERATION = """
+        if (redis.call('HGET', KEYS[1], ARGV[1]) or '') == ARGV[2] then
+            redis.call('HSET', KEYS[1], ARGV[3], ARGV[4])
+            redis.call('EXPIRE', KEYS[1], ARGV[5])
+            return 1
+        end
+        return 0
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float = 60,
+        prefix: str = "resume:view:",
+        client=None,
+    ):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._invalidate = client.register_script(self._INVALIDATE)
+        self._set_if_generation = client.register_script(self._SET_IF_GENERATION)
+
+    def _read(self, uuid, field):
+        raw, generation = self.client.hmget(self.prefix + uuid, field, self.GENERATION)
+        value = None if raw is None else json.loads(raw)
+        return value, b"" if generation is None else generation
+
+    def get(self, uuid, field):
+        return self._read(uuid, field)[0]
+
+    def set(self, uuid, field, value):
+        key = self.prefix + uuid
+        pipe = self.client.pipeline()
+        pipe.hset(key, field, json.dumps(value))
+        pipe.expire(key, int(self.ttl))
+        pipe.execute()
+
+    def invalidate(self, uuid):
+        self._invalidate(
+            keys=[self.prefix + uuid], args=[self.GENERATION, int(self.ttl)]
+        )
+
+    def get_or_load(self, uuid, field, load):
+        value, generation = self._read(uuid, field)
+        if value is not None:
+            return value
+        value = load()
+        if value is not None:
+            self._set_if_generation(
+                keys=[self.prefix + uuid],
+                args=[
+                    self.GENERATION,
+                    generation,
+                    field,
+                    json.dumps(value),
+                    int(self.ttl),
+                ],
+            )
+        return value
+
+
+def from_config(config: dict) -> AbstractCache:
+    if not config["enabled"]:
+        return NullCache()
+    if config["redis_url"]:
+        # no in-process tier in front: invalidations by the consumers only
+        # reach the shared cache
+        return RedisCache(config["redis_url"], ttl=config["ttl"])
+    # invalidated by this process's handlers only, others' writes show up
+    # when the entries expire
+    return LRUCache(max_size=config["max_size"], ttl=config["ttl"])
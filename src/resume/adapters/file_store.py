@@ -0,0 +1,300 @@
+import abc
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import quote, unquote, urlparse
+
+
+class AbstractFileStore(abc.ABC):
+    """Reads and writes resume files by link.
+
+    ``read``/``write`` are blocking. ``read_many`` and the ``a``-prefixed
+    coroutines run them on the store's own thread pool, so a batch of files is
+    fetched concurrently over the store's pooled connections.
+    """
+
+    def __init__(self, max_connections: int = 10):
+        self.max_connections = max_connections
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def read(self, link: str) -> bytes:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def write(self, name: str, bytes: bytes) -> str:
+        raise NotImplementedError
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # created on first use, so a store built before forking doesn't hand
+        # dead threads to the children
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_connections,
+                    thread_name_prefix="file-store",
+                )
+            return self._executor
+
+    def read_many(self, links: Iterable[str]) -> Dict[str, bytes]:
+        links = list(dict.fromkeys(links))
+        if len(links) <= 1:
+            return {link: self.read(link) for link in links}
+        return dict(zip(links, self.executor.map(self.read, links)))
+
+    async def aread(self, link: str) -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.read, link)
+
+    async def awrite(self, name: str, bytes: bytes) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.write, name, bytes)
+
+    async def aread_many(self, links: Iterable[str]) -> Dict[str, bytes]:
+        links = list(dict.fromkeys(links))
+        blobs = await asyncio.gather(*[self.aread(link) for link in links])
+        return dict(zip(links, blobs))
+
+    def prefetch(self, links: Iterable[str]):
+        # only meaningful for caching stores
+        pass
+
+
+class LocalFileStore(AbstractFileStore):
+    """Keeps files in a local directory, for development and tests."""
+
+    def __init__(self, root: str, max_connections: int = 10):
+        super().__init__(max_connections)
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, link: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, link))
+        if os.path.commonpath([path, os.path.abspath(self.root)]) != os.path.abspath(
+            self.root
+        ):
+            raise ValueError(f"link outside of the store: {link!r}")
+        return path
+
+    def read(self, link):
+        with open(self._path(link), "rb") as f:
+            return f.read()
+
+    def write(self, name, bytes):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(bytes)
+        return name
+
+
+class InMemoryFileStore(AbstractFileStore):
+    def __init__(self, max_connections: int = 10):
+        super().__init__(max_connections)
+        self.files = {}
+
+    def read(self, link):
+        return self.files[link]
+
+    def write(self, name, bytes):
+        self.files[name] = bytes
+        return name
+
+
+class S3FileStore(AbstractFileStore):
+    """Writes ``<prefix>/<name>`` keys and returns their virtual-hosted S3 URL
+    as the link, the form resume links have always had.
+
+    Links may also be ``s3://bucket/key``, path-style S3 URLs or bare keys of
+    the configured bucket; those are read from the bucket and key they name.
+    """
+
+    # a single client is shared by every thread, boto3 clients are thread
+    # safe and pool their connections up to max_pool_connections
+    def __init__(
+        self,
+        bucket: str,
+        prefix: Optional[str] = None,
+        aws_region: Optional[str] = None,
+        max_connections: int = 10,
+        client=None,
+    ):
+        super().__init__(max_connections)
+        self.bucket = bucket
+        self.prefix = prefix or ""
+        self.aws_region = aws_region
+        if client is None:
+            import boto3
+            from botocore.config import Config
+
+            client = boto3.client(
+                "s3",
+                region_name=aws_region,
+                config=Config(max_pool_connections=max_connections),
+            )
+        self.client = client
+
+    def _location(self, link: str) -> Tuple[str, str]:
+        url = urlparse(link)
+        if url.scheme == "s3":
+            return url.netloc, unquote(url.path.lstrip("/"))
+        if url.scheme in ("http", "https"):
+            path = unquote(url.path.lstrip("/"))
+            host = url.netloc.split(":")[0]
+            if ".s3." in host and not host.startswith("s3."):
+                # virtual-hosted: <bucket>.s3.<region>.amazonaws.com/<key>
+                return host.split(".s3.", 1)[0], path
+            # path-style: s3.<region>.amazonaws.com/<bucket>/<key>
+            bucket, _, key = path.partition("/")
+            return bucket, key
+        return self.bucket, link
+
+    def _url(self, key: str) -> str:
+        if self.aws_region:
+            host = f"{self.bucket}.s3.{self.aws_region}.amazonaws.com"
+        else:
+            host = f"{self.bucket}.s3.amazonaws.com"
+        return f"https://{host}/{quote(key)}"
+
+    def read(self, link):
+        bucket, key = self._location(link)
+        response = self.client.get_object(Bucket=bucket, Key=key)
+        return response["Body"].read()
+
+    def write(self, name, bytes):
+        key = f"{self.prefix.rstrip('/')}/{name}" if self.prefix else name
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=bytes)
+        return self._url(key)
+
+
+class CachedFileStore(AbstractFileStore):
+    """Keeps recently written and prefetched files in memory for a short while.
+
+    A file written by one handler is handed to the next one reading it, e.g.
+    the redacted PDF from ``redact_resume`` to the coordinate handler, instead
+    of being downloaded again.
+    """
+
+    def __init__(
+        self,
+        store: AbstractFileStore,
+        ttl: float = 30,
+        max_bytes: int = 64 * 1024 * 1024,
+        clock=time.monotonic,
+    ):
+        super().__init__(store.max_connections)
+        self.store = store
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._size = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def executor(self):
+        return self.store.executor
+
+    def _get(self, link):
+        with self._lock:
+            entry = self._entries.get(link)
+            if entry is None or entry[0] < self.clock():
+                if entry is not None:
+                    self._pop(link)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(link)
+            self.hits += 1
+            return entry[1]
+
+    def _set(self, link, bytes):
+        if len(bytes) > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(link)
+            self._entries[link] = (self.clock() + self.ttl, bytes)
+            self._size += len(bytes)
+            while self._size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, link):
+        entry = self._entries.pop(link, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def read(self, link):
+        blob = self._get(link)
+        if blob is None:
+            with self._lock:
+                pending = self._pending.get(link)
+            if pending is not None and pending.exception() is None:
+                # a prefetch is already downloading it
+                return pending.result()
+            blob = self.store.read(link)
+            self._set(link, blob)
+        return blob
+
+    def write(self, name, bytes):
+        link = self.store.write(name, bytes)
+        self._set(link, bytes)
+        return link
+
+    def read_many(self, links):
+        links = list(dict.fromkeys(links))
+        blobs = {}
+        missing = []
+        for link in links:
+            blob = self._get(link)
+            if blob is None:
+                missing.append(link)
+            else:
+                blobs[link] = blob
+        for link, blob in self.store.read_many(missing).items():
+            self._set(link, blob)
+            blobs[link] = blob
+        return {link: blobs[link] for link in links}
+
+    def prefetch(self, links):
+        for link in dict.fromkeys(links):
+            with self._lock:
+                if link in self._entries or link in self._pending:
+                    continue
+                future = self.executor.submit(self.store.read, link)
+                self._pending[link] = future
+            future.add_done_callback(
+                lambda future, link=link: self._prefetched(link, future)
+            )
+
+    def _prefetched(self, link, future):
+        with self._lock:
+            self._pending.pop(link, None)
+        if future.exception() is None:
+            self._set(link, future.result())
+
+
+def from_config(config: dict, s3_config: dict) -> AbstractFileStore:
+    if config["local_root"]:
+        store = LocalFileStore(
+            config["local_root"], max_connections=config["max_connections"]
+        )
+    else:
+        store = S3FileStore(
+            s3_config["bucket"],
+            prefix=s3_config["prefix"],
+            aws_region=s3_config["aws_region"],
+            max_connections=config["max_connections"],
+        )
+    if config["cache_ttl"] <= 0:
+        return store
+    return CachedFileStore(
+        store, ttl=config["cache_ttl"], max_bytes=config["cache_max_bytes"]
+    )
@@ -7,13 +7,15 @@ from sqlalchemy import (
     Boolean,
     ForeignKey,
     Index,
+    DateTime,
+    Float,
     event,
     DDL,
     text,
 )
-from sqlalchemy.dialects.postgresql import TSVECTOR, REAL
+from sqlalchemy.dialects.postgresql import TSVECTOR, REAL, JSONB
 from sqlalchemy.sql.expression import func
-from sqlalchemy.orm import registry, relationship
+from sqlalchemy.orm import registry, relationship, deferred
 
 from resume.domain import model
 
@@ -35,6 +37,10 @@ prospect = Table(
     ),
 )
 
+# hash partitioned by resume, every query on it is for one resume or a page of
+# them; see migrations/0001_partition_text_coordinates.sql
+TEXT_COORDINATES_PARTITIONS = 16
+
 text_coordinates = Table(
     "text_coordinates",
     metadata,
@@ -50,10 +56,44 @@ text_coordinates = Table(
         "resume_id",
         Integer,
         ForeignKey("resume.id", ondelete="CASCADE"),
+        primary_key=True,
+        autoincrement=False,
+    ),
+    # covers listing and replacing a resume's coordinates (index-only scans)
+    Index(
+        "ix_text_coordinates_resume_id",
+        "resume_id",
+        "redacted",
+        postgresql_include=["text", "x0", "x1", "y0", "y1"],
     ),
-    Index("ix_text_coordinates_tsv", "tsv", postgresql_using="gin"),
+    # highlights: the resume and the keywords in one GIN scan, needs btree_gin
+    Index(
+        "ix_text_coordinates_resume_id_tsv",
+        "resume_id",
+        "tsv",
+        postgresql_using="gin",
+    ),
+    postgresql_partition_by="HASH (resume_id)",
 )
 
+event.listen(
+    text_coordinates,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gin").execute_if(dialect="postgresql"),
+)
+for remainder in range(TEXT_COORDINATES_PARTITIONS):
+    event.listen(
+        text_coordinates,
+        "after_create",
+        DDL(
+            f"""
+            CREATE TABLE text_coordinates_p{remainder}
+            PARTITION OF text_coordinates
+            FOR VALUES WITH (MODULUS {TEXT_COORDINATES_PARTITIONS}, REMAINDER {remainder})
+            """
+        ).execute_if(dialect="postgresql"),
+    )
+
 text_coordinates_tsv_trigger = DDL(
     """
     CREATE TRIGGER text_coordinate_tsv_update BEFORE INSERT OR UPDATE
@@ -88,6 +128,9 @@ resume = Table(
     Column("width", Integer),
     Column("height", Integer),
     Column("redaction_version", Integer),
+    Column("redaction_failed", Boolean, server_default=text("false")),
+    Column("preview_links", JSONB, nullable=True),
+    Column("preview_pages", JSONB, nullable=True),
     Index("ix_resume_tsv", "tsv", postgresql_using="gin"),
     Index("ix_resume_redacted_tsv", "redacted_tsv", postgresql_using="gin"),
 )
@@ -116,6 +159,41 @@ event.listen(
     resume, "after_create", resume_redacted_tsv_trigger.execute_if(dialect="postgresql")
 )
 
+outbox = Table(
+    "outbox",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("topic", String, nullable=False),
+    Column("payload", JSONB, nullable=False),
+    Column("created_at", DateTime, server_default=func.now(), nullable=False),
+    Column("published_at", DateTime, nullable=True),
+    Index(
+        "ix_outbox_unpublished",
+        "id",
+        postgresql_where=text("published_at IS NULL"),
+    ),
+)
+
+
+# idempotency keys of the commands the message bus has handled
+processed_messages = Table(
+    "processed_messages",
+    metadata,
+    Column("key", String, primary_key=True),
+    Column("processed_at", DateTime, server_default=func.now(), nullable=False),
+    # pruning deletes by age
+    Index("ix_processed_messages_processed_at", "processed_at"),
+)
+
+# token buckets shared by every worker, see adapters.admission
+rate_limits = Table(
+    "rate_limits",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("tokens", Float, nullable=False),
+    Column("refilled_at", DateTime, nullable=False),
+)
+
 
 def start_mappers():
     logger.info("Starting resume mappers")
@@ -128,7 +206,16 @@ def start_mappers():
         resume,
         properties={
             # "prospect_id": resume.c.student_id,
-            "text_coordinates": relationship(text_coordinate_mapper),
+            # large text columns are only loaded when accessed
+            "text": deferred(resume.c.text),
+            "redacted_text": deferred(resume.c.redacted_text),
+            "tsv": deferred(resume.c.tsv),
+            "redacted_tsv": deferred(resume.c.redacted_tsv),
+            # never loaded: the repository appends and replaces text coordinates
+            # with set-based SQL, touching the collection raises
+            "text_coordinates": relationship(
+                text_coordinate_mapper, lazy="raise", passive_deletes=True
+            ),
         },
     )
     logger.info("Finished resume mappers")
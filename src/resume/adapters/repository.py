@@ -1,8 +1,15 @@
 import abc
+import select as select_module
+import time
+from datetime import timedelta
+from typing import List, Optional, Sequence
 
+from resume.adapters import orm
 from resume.domain import model
 from resume.config import get_current_redaction_version
-from sqlalchemy import or_, func
+from sqlalchemy import or_, func, delete, exists, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import load_only
 
 
 class AbstractRepository(abc.ABC):
@@ -19,18 +26,49 @@ class AbstractRepository(abc.ABC):
             self.seen.add(resume)
         return resume
 
-    def get_by_uuid(self, uuid) -> model.Resume:
-        resume = self._get_by_uuid(uuid)
+    def get_by_uuid(self, uuid, fields: Optional[Sequence[str]] = None) -> model.Resume:
+        # fields limits the loaded columns, anything else is loaded on access
+        resume = self._get_by_uuid(uuid, fields)
         if resume:
             self.seen.add(resume)
         return resume
 
-    def get_without_redacted(self) -> model.Resume:
-        resume = self._get_without_redacted()
+    def get_without_redacted(
+        self, fields: Optional[Sequence[str]] = None
+    ) -> model.Resume:
+        resume = self._get_without_redacted(fields)
         if resume:
             self.seen.add(resume)
         return resume
 
+    def list_without_redacted(
+        self, limit: int, fields: Optional[Sequence[str]] = None
+    ) -> List[model.Resume]:
+        resumes = self._list_without_redacted(limit, fields)
+        self.seen.update(resumes)
+        return resumes
+
+    def add_text_coordinates(
+        self, resume: model.Resume, text_coordinates: List[model.TextCoordinates]
+    ):
+        self._add_text_coordinates(resume, text_coordinates)
+
+    def replace_text_coordinates(
+        self,
+        resume: model.Resume,
+        text_coordinates: List[model.TextCoordinates],
+        redacted: bool = False,
+    ):
+        self._replace_text_coordinates(resume, text_coordinates, redacted)
+
+    def list_text_coordinates(
+        self, resume: model.Resume, redacted: bool = False
+    ) -> List[model.TextCoordinates]:
+        return self._list_text_coordinates(resume, redacted)
+
+    def has_text_coordinates(self, resume: model.Resume, redacted: bool = False) -> bool:
+        return self._has_text_coordinates(resume, redacted)
+
     @abc.abstractmethod
     def _add(self, resume: model.Resume):
         raise NotImplementedError
@@ -40,11 +78,31 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def _get_by_uuid(self, uuid) -> model.Resume:
+    def _get_by_uuid(self, uuid, fields=None) -> model.Resume:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _get_without_redacted(self, fields=None) -> model.Resume:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _list_without_redacted(self, limit, fields=None) -> List[model.Resume]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _add_text_coordinates(self, resume, text_coordinates):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _replace_text_coordinates(self, resume, text_coordinates, redacted):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _list_text_coordinates(self, resume, redacted):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def _get_without_redacted(self) -> model.Resume:
+    def _has_text_coordinates(self, resume, redacted) -> bool:
         raise NotImplementedError
 
 
@@ -65,12 +123,20 @@ class SqlAlchemyRepository(AbstractRepository):
     def _get(self, id):
         return self.session.query(model.Resume).filter_by(id=id).first()
 
-    def _get_by_uuid(self, uuid):
-        return self.session.query(model.Resume).filter_by(uuid=uuid).first()
+    def _query(self, fields=None):
+        query = self.session.query(model.Resume)
+        if fields:
+            query = query.options(
+                load_only(*[getattr(model.Resume, field) for field in fields])
+            )
+        return query
+
+    def _get_by_uuid(self, uuid, fields=None):
+        return self._query(fields).filter_by(uuid=uuid).first()
 
-    def _get_without_redacted(self) -> model.Resume:
+    def _without_redacted(self, fields=None):
         return (
-            self.session.query(model.Resume)
+            self._query(fields)
             .filter(
                 or_(
                     model.Resume.skip_redaction != True,
@@ -80,5 +146,311 @@ class SqlAlchemyRepository(AbstractRepository):
                 )
             )
             .order_by(func.random())
-            .first()
         )
+
+    def _get_without_redacted(self, fields=None) -> model.Resume:
+        return self._without_redacted(fields).first()
+
+    def _list_without_redacted(self, limit, fields=None):
+        return self._without_redacted(fields).limit(limit).all()
+
+    # text coordinates are written and read with set-based statements, the
+    # Resume.text_coordinates collection is never loaded
+
+    def _add_text_coordinates(self, resume, text_coordinates):
+        if not text_coordinates:
+            return
+        self.session.execute(
+            insert(orm.text_coordinates),
+            [
+                dict(
+                    resume_id=resume.id,
+                    redacted=tc.redacted,
+                    text=tc.text,
+                    x0=tc.x0,
+                    x1=tc.x1,
+                    y0=tc.y0,
+                    y1=tc.y1,
+                )
+                for tc in text_coordinates
+            ],
+        )
+
+    def _replace_text_coordinates(self, resume, text_coordinates, redacted):
+        self.session.execute(
+            delete(orm.text_coordinates).where(
+                orm.text_coordinates.c.resume_id == resume.id,
+                func.coalesce(orm.text_coordinates.c.redacted, False) == redacted,
+            )
+        )
+        self._add_text_coordinates(resume, text_coordinates)
+
+    def _list_text_coordinates(self, resume, redacted):
+        rows = self.session.execute(
+            select(
+                orm.text_coordinates.c.text,
+                orm.text_coordinates.c.x0,
+                orm.text_coordinates.c.x1,
+                orm.text_coordinates.c.y0,
+                orm.text_coordinates.c.y1,
+            ).where(
+                orm.text_coordinates.c.resume_id == resume.id,
+                func.coalesce(orm.text_coordinates.c.redacted, False) == redacted,
+            )
+        )
+        return [
+            model.TextCoordinates(resume_id=resume.id, redacted=redacted, **row)
+            for row in rows.mappings()
+        ]
+
+    def _has_text_coordinates(self, resume, redacted):
+        return self.session.execute(
+            select(
+                exists().where(
+                    orm.text_coordinates.c.resume_id == resume.id,
+                    func.coalesce(orm.text_coordinates.c.redacted, False) == redacted,
+                )
+            )
+        ).scalar()
+
+
+# notified on commit of rows added to the outbox, for the relay worker
+OUTBOX_CHANNEL = "outbox"
+
+
+class AbstractOutboxRepository(abc.ABC):
+    @abc.abstractmethod
+    def add(self, topic: str, payload: dict):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_unpublished(self, limit: int) -> List[dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def mark_published(self, ids: List[int]):
+        raise NotImplementedError
+
+
+class SqlAlchemyOutboxRepository(AbstractOutboxRepository):
+    def __init__(self, session):
+        self.session = session
+
+    def add(self, topic, payload):
+        self.session.execute(insert(orm.outbox).values(topic=topic, payload=payload))
+        # delivered on commit, and only once however many rows it added
+        self.session.execute(select(func.pg_notify(OUTBOX_CHANNEL, "")))
+
+    def list_unpublished(self, limit):
+        # skip rows another relay holds, so relays can run side by side
+        rows = self.session.execute(
+            select(orm.outbox.c.id, orm.outbox.c.topic, orm.outbox.c.payload)
+            .where(orm.outbox.c.published_at == None)
+            .order_by(orm.outbox.c.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return [dict(row) for row in rows.mappings()]
+
+    def mark_published(self, ids):
+        self.session.execute(
+            update(orm.outbox)
+            .where(orm.outbox.c.id.in_(ids))
+            .values(published_at=func.now())
+        )
+
+
+class OutboxListener:
+    """Waits for the notification SqlAlchemyOutboxRepository.add sends, on a
+    connection of its own held out of the pool."""
+
+    def __init__(self, engine, channel: str = OUTBOX_CHANNEL):
+        self.engine = engine
+        self.channel = channel
+        self._connection = None
+
+    def listen(self):
+        if self._connection is None:
+            connection = self.engine.raw_connection()
+            try:
+                connection.connection.autocommit = True
+                with connection.connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+            except Exception:
+                connection.invalidate()
+                raise
+            self._connection = connection
+        return self._connection.connection
+
+    def wait(self, timeout: float) -> bool:
+        """Returns whether rows were committed since the last call, after at
+        most ``timeout`` seconds."""
+        try:
+            connection = self.listen()
+            if not connection.notifies:
+                select_module.select([connection], [], [], timeout)
+                connection.poll()
+            notified = bool(connection.notifies)
+            connection.notifies.clear()
+            return notified
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            connection.invalidate()
+
+
+class AbstractProcessedMessageRepository(abc.ABC):
+    @abc.abstractmethod
+    def contains(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def add(self, key: str):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def prune(self, older_than_seconds: float) -> int:
+        """Forgets keys processed longer ago than that, returns how many."""
+        raise NotImplementedError
+
+
+class SqlAlchemyProcessedMessageRepository(AbstractProcessedMessageRepository):
+    def __init__(self, session):
+        self.session = session
+
+    def contains(self, key):
+        return self.session.execute(
+            select(exists().where(orm.processed_messages.c.key == key))
+        ).scalar()
+
+    def add(self, key):
+        # a concurrent redelivery may have finished first
+        self.session.execute(
+            pg_insert(orm.processed_messages)
+            .values(key=key)
+            .on_conflict_do_nothing(index_elements=["key"])
+        )
+
+    def prune(self, older_than_seconds):
+        # a range scan of ix_processed_messages_processed_at
+        return self.session.execute(
+            delete(orm.processed_messages).where(
+                orm.processed_messages.c.processed_at
+                < func.now() - timedelta(seconds=older_than_seconds)
+            )
+        ).rowcount
+
+
+class InMemoryRepository(AbstractRepository):
+    """Keeps resumes and their text coordinates in dicts, for load testing the
+    service layer without Postgres.
+    """
+
+    def __init__(self, current_redaction_version=DEFAULT_CURRENT_REDACTION_VERSION):
+        super().__init__()
+        self.current_redaction_version = current_redaction_version
+        self.resumes = {}
+        self.resumes_by_uuid = {}
+        self.text_coordinates = {}
+        self._next_id = 1
+
+    def _add(self, resume):
+        if resume.id is None:
+            resume.id = self._next_id
+            self._next_id += 1
+        self.resumes[resume.id] = resume
+        self.resumes_by_uuid[resume.uuid] = resume
+
+    def _get(self, id):
+        return self.resumes.get(id)
+
+    def _get_by_uuid(self, uuid, fields=None):
+        return self.resumes_by_uuid.get(uuid)
+
+    def _without_redacted(self):
+        return [
+            resume
+            for resume in self.resumes.values()
+            if not resume.skip_redaction
+            or resume.redaction_version is None
+            or resume.redaction_version < self.current_redaction_version
+        ]
+
+    def _get_without_redacted(self, fields=None):
+        resumes = self._without_redacted()
+        return resumes[0] if resumes else None
+
+    def _list_without_redacted(self, limit, fields=None):
+        return self._without_redacted()[:limit]
+
+    def _add_text_coordinates(self, resume, text_coordinates):
+        self.text_coordinates.setdefault(resume.id, []).extend(text_coordinates)
+
+    def _replace_text_coordinates(self, resume, text_coordinates, redacted):
+        self.text_coordinates[resume.id] = [
+            tc
+            for tc in self.text_coordinates.get(resume.id, [])
+            if bool(tc.redacted) != redacted
+        ] + list(text_coordinates)
+
+    def _list_text_coordinates(self, resume, redacted):
+        return [
+            tc
+            for tc in self.text_coordinates.get(resume.id, [])
+            if bool(tc.redacted) == redacted
+        ]
+
+    def _has_text_coordinates(self, resume, redacted):
+        return any(
+            bool(tc.redacted) == redacted
+            for tc in self.text_coordinates.get(resume.id, [])
+        )
+
+
+class InMemoryOutboxRepository(AbstractOutboxRepository):
+    def __init__(self):
+        self.rows = []
+
+    def add(self, topic, payload):
+        self.rows.append(
+            dict(id=len(self.rows) + 1, topic=topic, payload=payload, published=False)
+        )
+
+    def list_unpublished(self, limit):
+        return [
+            dict(id=row["id"], topic=row["topic"], payload=row["payload"])
+            for row in self.rows
+            if not row["published"]
+        ][:limit]
+
+    def mark_published(self, ids):
+        ids = set(ids)
+        for row in self.rows:
+            if row["id"] in ids:
+                row["published"] = True
+
+
+class InMemoryProcessedMessageRepository(AbstractProcessedMessageRepository):
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        # key -> processed at
+        self.keys = {}
+
+    def contains(self, key):
+        return key in self.keys
+
+    def add(self, key):
+        self.keys.setdefault(key, self.clock())
+
+    def prune(self, older_than_seconds):
+        cutoff = self.clock() - older_than_seconds
+        expired = [
+            key for key, processed_at in self.keys.items() if processed_at < cutoff
+        ]
+        for key in expired:
+            del self.keys[key]
+        return len(expired)
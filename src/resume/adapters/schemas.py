@@ -15,3 +15,35 @@ class Resume(ma.Schema):
     width = ma.fields.Integer()
     height = ma.fields.Integer()
     uuid = ma.fields.String()
+
+
+class ResumeBatch(ma.Schema):
+    data = ma.fields.Nested(Resume(many=True))
+
+
+class ResumeSearch(ma.Schema):
+    data = ma.fields.Nested(Resume(many=True))
+    next_cursor = ma.fields.String(allow_none=True)
+
+
+COMPACT_MEDIA_TYPE = "application/vnd.resume.compact+json"
+
+
+def dump_compact_resume(resume: dict, ndigits: int = 2) -> dict:
+    # columnar text coordinates with rounded floats, without going through
+    # marshmallow; the hot GET path for resumes with many highlight boxes
+    text_coordinates = resume.get("text_coordinates") or []
+    columns = {
+        "text": [tc["text"] for tc in text_coordinates],
+        "x0": [round(tc["x0"], ndigits) for tc in text_coordinates],
+        "x1": [round(tc["x1"], ndigits) for tc in text_coordinates],
+        "y0": [round(tc["y0"], ndigits) for tc in text_coordinates],
+        "y1": [round(tc["y1"], ndigits) for tc in text_coordinates],
+    }
+    return dict(
+        link=resume.get("link"),
+        text_coordinates=columns,
+        width=resume.get("width"),
+        height=resume.get("height"),
+        uuid=resume.get("uuid"),
+    )
@@ -1,8 +1,16 @@
 from typing import Callable
 import inspect
+from resume.adapters import cache as resume_cache
+from resume.adapters import file_store as resume_file_store
 from resume.adapters.orm import start_mappers
 from resume.service_layer import handlers, unit_of_work, messagebus
-from resume.config import get_resume_s3_config
+from resume.service_layer.profiling import HandlerProfiler
+from resume.service_layer.scheduler import RedactionScheduler
+from resume.config import (
+    get_file_store_config,
+    get_resume_s3_config,
+    get_resume_cache_config,
+)
 
 DEFAULT_AWS_REGION = get_resume_s3_config()["aws_region"]
 DEFAULT_BUCKET = get_resume_s3_config()["bucket"]
@@ -11,13 +19,37 @@ DEFAULT_PREFIX = get_resume_s3_config()["prefix"]
 
 def bootstrap(
     start_orm: bool = True,
-    uow: unit_of_work.AbstractUnitOfWork = unit_of_work.SqlAlchemyUnitOfWork(),
+    uow: unit_of_work.AbstractUnitOfWork | None = None,
+    cache: resume_cache.AbstractCache | None = None,
+    scheduler: RedactionScheduler | None = None,
+    profiler: HandlerProfiler | None = None,
+    file_store: resume_file_store.AbstractFileStore | None = None,
+    raise_errors: bool = False,
 ):
 
     if start_orm:
         start_mappers()
 
-    dependencies = {"uow": uow}
+    if uow is None:
+        uow = unit_of_work.SqlAlchemyUnitOfWork()
+
+    if cache is None:
+        cache = resume_cache.from_config(get_resume_cache_config())
+
+    if scheduler is None:
+        scheduler = RedactionScheduler.from_config()
+
+    if file_store is None:
+        file_store = resume_file_store.from_config(
+            get_file_store_config(), get_resume_s3_config()
+        )
+
+    dependencies = {
+        "uow": uow,
+        "cache": cache,
+        "scheduler": scheduler,
+        "file_store": file_store,
+    }
     injected_event_handlers = {
         event_type: [
             inject_dependencies(handler, dependencies) for handler in event_handlers
@@ -33,6 +65,8 @@ def bootstrap(
         uow=uow,
         event_handlers=injected_event_handlers,
         command_handlers=injected_command_handlers,
+        profiler=profiler or HandlerProfiler.from_config(),
+        raise_errors=raise_errors,
     )
 
 def inject_dependencies(handler, dependencies):
@@ -13,6 +13,170 @@ def get_resume_s3_config():
     return dict(aws_region=aws_region, prefix=prefix, bucket=bucket)
 
 
+def get_file_store_config():
+    local_root = os.environ.get("RESUME_FILE_STORE_ROOT")
+    max_connections = int(os.environ.get("RESUME_FILE_STORE_MAX_CONNECTIONS", 10))
+    cache_ttl = float(os.environ.get("RESUME_FILE_STORE_CACHE_TTL", 30))
+    cache_max_bytes = int(
+        os.environ.get("RESUME_FILE_STORE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+    )
+    return dict(
+        local_root=local_root,
+        max_connections=max_connections,
+        cache_ttl=cache_ttl,
+        cache_max_bytes=cache_max_bytes,
+    )
+
+
+def get_search_config():
+    # the newest matches ranked per search, see views.search_resumes
+    max_candidates = int(os.environ.get("RESUME_SEARCH_MAX_CANDIDATES", 1000))
+    return dict(max_candidates=max_candidates)
+
+
 def get_rabbitmq_consumer_config():
     namespace = "resume"
-    return dict(namespace=namespace)
+    url = os.environ.get("RABBITMQ_URL")
+    exchange = os.environ.get("RABBITMQ_EXCHANGE", namespace)
+    return dict(namespace=namespace, url=url, exchange=exchange)
+
+
+def get_processed_messages_config():
+    # keys must outlive any redelivery of their message: unacked messages and
+    # outbox rows republished after a failed mark_published
+    retention_seconds = float(
+        os.environ.get("PROCESSED_MESSAGES_RETENTION_SECONDS", 7 * 24 * 3600)
+    )
+    prune_interval = float(os.environ.get("PROCESSED_MESSAGES_PRUNE_INTERVAL", 3600))
+    return dict(retention_seconds=retention_seconds, prune_interval=prune_interval)
+
+
+def get_resume_cache_config():
+    enabled = os.environ.get("RESUME_CACHE_ENABLED", "true").lower() == "true"
+    max_size = int(os.environ.get("RESUME_CACHE_MAX_SIZE", 1024))
+    ttl = float(os.environ.get("RESUME_CACHE_TTL", 60))
+    redis_url = os.environ.get("RESUME_CACHE_REDIS_URL")
+    return dict(enabled=enabled, max_size=max_size, ttl=ttl, redis_url=redis_url)
+
+
+def get_postgres_pool_config():
+    pool_size = int(os.environ.get("POSTGRES_POOL_SIZE", 5))
+    max_overflow = int(os.environ.get("POSTGRES_MAX_OVERFLOW", 20))
+    pool_timeout = float(os.environ.get("POSTGRES_POOL_TIMEOUT", 30))
+    pool_recycle = int(os.environ.get("POSTGRES_POOL_RECYCLE", 1800))
+    pool_pre_ping = os.environ.get("POSTGRES_POOL_PRE_PING", "true").lower() == "true"
+    return dict(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+    )
+
+
+def get_pdf_limits_config():
+    supervise = os.environ.get("PDF_SUPERVISE", "true").lower() == "true"
+    max_bytes = int(os.environ.get("PDF_MAX_BYTES", 20 * 1024 * 1024))
+    max_pages = int(os.environ.get("PDF_MAX_PAGES", 50))
+    max_objects = int(os.environ.get("PDF_MAX_OBJECTS", 200_000))
+    max_chars_per_page = int(os.environ.get("PDF_MAX_CHARS_PER_PAGE", 50_000))
+    max_memory_bytes = int(os.environ.get("PDF_MAX_MEMORY_BYTES", 1024 * 1024 * 1024))
+    default_deadline = float(os.environ.get("PDF_STAGE_DEADLINE", 60))
+    deadlines = {
+        stage: float(os.environ.get(f"PDF_{stage.upper()}_DEADLINE", default_deadline))
+        for stage in ("parse", "coordinates", "redaction", "previews")
+    }
+    return dict(
+        supervise=supervise,
+        max_bytes=max_bytes,
+        max_pages=max_pages,
+        max_objects=max_objects,
+        max_chars_per_page=max_chars_per_page,
+        max_memory_bytes=max_memory_bytes,
+        default_deadline=default_deadline,
+        deadlines=deadlines,
+    )
+
+
+def get_preview_config():
+    widths = [
+        int(width)
+        for width in os.environ.get("RESUME_PREVIEW_WIDTHS", "320,640,1280").split(",")
+        if width
+    ]
+    image_format = os.environ.get("RESUME_PREVIEW_FORMAT", "png").lower()
+    max_pages = int(os.environ.get("RESUME_PREVIEW_MAX_PAGES", 3))
+    # previews keep their URL across redaction versions, so not too long
+    max_age = int(os.environ.get("RESUME_PREVIEW_MAX_AGE", 300))
+    return dict(
+        widths=widths, image_format=image_format, max_pages=max_pages, max_age=max_age
+    )
+
+
+def get_redaction_parallelism_config():
+    # off by default: every worker process would fork this many shards, and
+    # the redaction stage's memory cap is split between them
+    enabled = os.environ.get("REDACTION_PARALLEL", "false").lower() == "true"
+    workers = int(os.environ.get("REDACTION_WORKERS", os.cpu_count() or 1))
+    min_pages_per_shard = int(os.environ.get("REDACTION_MIN_PAGES_PER_SHARD", 4))
+    return dict(
+        enabled=enabled, workers=workers, min_pages_per_shard=min_pages_per_shard
+    )
+
+
+def get_redaction_scheduler_config():
+    # shared: slots and the backfill rate are counted across every process
+    # through Postgres, otherwise in each process on its own
+    shared = os.environ.get("REDACTION_SHARED_ADMISSION", "true").lower() == "true"
+    capacity = int(os.environ.get("REDACTION_CAPACITY", 4))
+    reserved_interactive = int(os.environ.get("REDACTION_RESERVED_INTERACTIVE", 1))
+    backfill_per_minute = float(os.environ.get("REDACTION_BACKFILL_PER_MINUTE", 60))
+    poll_interval = float(os.environ.get("REDACTION_ADMISSION_POLL_INTERVAL", 1))
+    return dict(
+        shared=shared,
+        capacity=capacity,
+        reserved_interactive=reserved_interactive,
+        backfill_per_minute=backfill_per_minute,
+        poll_interval=poll_interval,
+    )
+
+
+def get_worker_config():
+    workers = int(os.environ.get("RESUME_WORKERS", os.cpu_count() or 1))
+    consumers = int(os.environ.get("RESUME_CONSUMERS", workers))
+    preload_cmaps = [
+        name
+        for name in os.environ.get(
+            "RESUME_WORKER_PRELOAD_CMAPS",
+            "Adobe-Japan1,Adobe-GB1,Adobe-CNS1,Adobe-Korea1",
+        ).split(",")
+        if name
+    ]
+    idle_sleep = float(os.environ.get("RESUME_WORKER_IDLE_SLEEP", 5))
+    backfill_batch_size = int(os.environ.get("RESUME_WORKER_BACKFILL_BATCH_SIZE", 1))
+    relay_poll_interval = float(os.environ.get("RESUME_WORKER_RELAY_POLL_INTERVAL", 1))
+    return dict(
+        workers=workers,
+        consumers=consumers,
+        preload_cmaps=preload_cmaps,
+        idle_sleep=idle_sleep,
+        backfill_batch_size=backfill_batch_size,
+        relay_poll_interval=relay_poll_interval,
+    )
+
+
+def get_profiling_config():
+    directory = os.environ.get("RESUME_PROFILE_DIR")
+    sample_rate = float(os.environ.get("RESUME_PROFILE_SAMPLE_RATE", 0))
+    threshold_ms = os.environ.get("RESUME_PROFILE_THRESHOLD_MS")
+    threshold_seconds = float(threshold_ms) / 1000 if threshold_ms else None
+    # the fraction of calls timed against the threshold, each one profiled
+    threshold_sample_rate = float(
+        os.environ.get("RESUME_PROFILE_THRESHOLD_SAMPLE_RATE", 0.1)
+    )
+    return dict(
+        directory=directory,
+        sample_rate=sample_rate,
+        threshold_seconds=threshold_seconds,
+        threshold_sample_rate=threshold_sample_rate,
+    )
@@ -1,8 +1,14 @@
 from dataclasses import dataclass, field
 
+INTERACTIVE = "interactive"
+BACKFILL = "backfill"
+PRIORITIES = (INTERACTIVE, BACKFILL)
+
 
 class Command:
-    pass
+    # commands with an idempotency_key are handled at most once per key, the
+    # message bus skips keys it has already processed
+    idempotency_key = None
 
 
 @dataclass
@@ -15,6 +21,7 @@ class CreateResume(Command):
 @dataclass
 class AttachTextCoordinates(Command):
     uuid: str
+    idempotency_key: str | None = None
 
 
 @dataclass
@@ -24,9 +31,16 @@ class AttachRedactedTextCoordinates(Command):
 
 @dataclass
 class KickoffResumeRedaction(Command):
-    pass
+    batch_size: int = 1
 
 
 @dataclass
 class RedactResume(Command):
     uuid: str
+    priority: str = INTERACTIVE
+    idempotency_key: str | None = None
+
+
+@dataclass
+class PruneProcessedMessages(Command):
+    older_than_seconds: float
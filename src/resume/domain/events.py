@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import List, Optional, Tuple
 
 
 class Event:
@@ -13,3 +14,6 @@ class ResumeCreated(Event):
 @dataclass
 class ResumeRedacted(Event):
     uuid: str
+    # rects blacked out on the first page, in the space of text coordinates;
+    # None when unknown
+    redacted_rects: Optional[List[Tuple[float, float, float, float]]] = None
@@ -0,0 +1,76 @@
+from collections import defaultdict
+from dataclasses import replace
+from typing import Iterable, List, Tuple
+
+from resume.domain.model import TextCoordinates
+
+Rect = Tuple[float, float, float, float]
+
+
+class RectGrid:
+    """Uniform grid over redaction rects for cheap overlap queries.
+
+    Each rect is bucketed into every cell it touches, so a query only tests the
+    rects sharing a cell with the queried box instead of all of them.
+    """
+
+    def __init__(self, rects: Iterable[Rect], cell_size: float = 50.0):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        for rect in rects:
+            rect = _normalize(rect)
+            for cell in self._cells(rect):
+                self.cells[cell].append(rect)
+
+    def _cells(self, rect: Rect):
+        x0, y0, x1, y1 = rect
+        for i in range(int(x0 // self.cell_size), int(x1 // self.cell_size) + 1):
+            for j in range(int(y0 // self.cell_size), int(y1 // self.cell_size) + 1):
+                yield i, j
+
+    def covered_fraction(self, box: Rect) -> float:
+        box = _normalize(box)
+        area = _area(box)
+        if area == 0:
+            return 0.0
+        seen = set()
+        covered = 0.0
+        for cell in self._cells(box):
+            for rect in self.cells.get(cell, ()):
+                if rect in seen:
+                    continue
+                seen.add(rect)
+                covered += _area(_intersection(box, rect))
+        return min(covered / area, 1.0)
+
+
+def _normalize(rect: Rect) -> Rect:
+    x0, y0, x1, y1 = rect
+    return (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+
+def _intersection(a: Rect, b: Rect) -> Rect:
+    return (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+
+
+def _area(rect: Rect) -> float:
+    return max(rect[2] - rect[0], 0.0) * max(rect[3] - rect[1], 0.0)
+
+
+def filter_redacted_text_coordinates(
+    text_coordinates: List[TextCoordinates],
+    redacted_rects: Iterable[Rect],
+    resume_id: int = None,
+    max_covered: float = 0.05,
+) -> List[TextCoordinates]:
+    """Derives the redacted document's text coordinates from the original ones.
+
+    Words overlapping a redaction rect are dropped. This errs on the side of
+    dropping, so a highlight never points at blacked out content.
+    """
+    grid = RectGrid(redacted_rects)
+    return [
+        replace(tc, id=None, resume_id=resume_id, redacted=True)
+        for tc in text_coordinates
+        if grid.covered_fraction((tc.x0, tc.y0, tc.x1, tc.y1)) < max_covered
+    ]
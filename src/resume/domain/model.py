@@ -1,25 +1,36 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import reduce
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 import io
+import math
 import re
 import logging
-from pdfminer.high_level import extract_text
-from pdfminer.layout import LAParams, LTText, LTChar, LTAnno
-from pdfminer.pdfpage import PDFPage
-from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
-from pdfminer.converter import PDFPageAggregator
-from resume.domain.redaction import RedactionStrategy
-import scrubadub
-import scrubadub_stanford
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import resource
+from resume.domain.redaction import (
+    PageRedactionStrategy,
+    RedactionStrategy,
+    iter_dirty_words,
+    iter_sentence_chunks,
+    read_output,
+    text_to_page_matrix,
+)
 
+# pdfminer, scrubadub and scrubadub_stanford are imported where they are used,
+# so importing the domain model (e.g. from the web entry point) stays cheap
 
 from .consts import STOP_WORDS
 
 logging.getLogger("pdfminer").setLevel(logging.WARNING)
 
 
+class ResourceLimitExceeded(Exception):
+    pass
+
+
 @dataclass(unsafe_hash=True)
 class Prospect:
     uuid: Optional[str]
@@ -51,6 +62,9 @@ class Resume:
         skip_redaction: bool | None = None,
         show_redacted: bool | None = None,
         redaction_version: int | None = None,
+        redaction_failed: bool | None = None,
+        preview_links: dict | None = None,
+        preview_pages: list | None = None,
         bytes: bytes | None = None,
         id: Optional[int] = None,
         uuid: Optional[str] = None,
@@ -73,23 +87,53 @@ class Resume:
         self.redacted_text = redacted_text
         self.show_redacted = show_redacted
         self.redaction_version = redaction_version
+        self.redaction_failed = redaction_failed
+        # {str(width): [link of page 0, link of page 1, ...]}
+        self.preview_links = preview_links
+        # [{"width": ..., "height": ..., "matrix": [...]} of page 0, ...]
+        self.preview_pages = preview_pages
 
         self.events = []
 
     @classmethod
-    def from_bytes(cls, bytes: bytes, **kwargs):
+    def from_bytes(cls, bytes: bytes, max_chars_per_page: int | None = None, **kwargs):
         width, height = resume_measurer(bytes)
         text = parse_resume_text(bytes)
+        if max_chars_per_page is not None:
+            check_page_chars(text, max_chars_per_page)
         return cls(width=width, height=height, text=text, **kwargs)
 
-    def set_text_coordinates(self, text_coordinates: List[TextCoordinates]):
-        self.text_coordinates = text_coordinates
 
-    def add_text_coordinates(self, text_coordinates: List[TextCoordinates]):
-        self.text_coordinates = self.text_coordinates + text_coordinates
+def check_pdf_limits(bytes: bytes, max_bytes: int, max_pages: int, max_objects: int):
+    # structural checks only, nothing here parses a content stream
+    import fitz
+
+    if len(bytes) > max_bytes:
+        raise ResourceLimitExceeded(f"{len(bytes)} bytes exceeds {max_bytes}")
+    with fitz.Document(stream=bytes, filetype="pdf") as pdf:
+        if pdf.page_count > max_pages:
+            raise ResourceLimitExceeded(
+                f"{pdf.page_count} pages exceeds {max_pages}"
+            )
+        if pdf.xref_length() > max_objects:
+            raise ResourceLimitExceeded(
+                f"{pdf.xref_length()} objects exceeds {max_objects}"
+            )
+
+
+def check_page_chars(text: str, max_chars_per_page: int):
+    # pages are separated by form feeds
+    for page_number, page_text in enumerate(text.split("\f")):
+        if len(page_text) > max_chars_per_page:
+            raise ResourceLimitExceeded(
+                f"{len(page_text)} characters on page {page_number} exceeds "
+                f"{max_chars_per_page}"
+            )
 
 
 def parse_resume_text(blob: bytes) -> str:
+    from pdfminer.high_level import extract_text
+
     stream = io.BytesIO(blob)
     text = extract_text(stream)
     stream.close()
@@ -97,25 +141,310 @@ def parse_resume_text(blob: bytes) -> str:
     return text
 
 
-def find_dirty_words(text):
+def find_dirty_words(
+    text, chunk_chars: Optional[int] = 5000, overlap_sentences: int = 1
+):
+    # chunk_chars=None tags the whole text at once
+    import scrubadub
+    import scrubadub_stanford
+
     scrubber = scrubadub.Scrubber()
     scrubber.add_detector(
         scrubadub_stanford.detectors.StanfordEntityDetector(enable_person=True)
     )
+    if chunk_chars is not None:
+        # tagged in sentence chunks, so long texts don't go to the tagger whole
+        chunks = iter_sentence_chunks([text], chunk_chars, overlap_sentences)
+        return [
+            word
+            for _, words, _ in iter_dirty_words(chunks, scrubber)
+            for word in words
+        ]
     filth_list = list(scrubber.iter_filth(text, document_name=None))
     filth_list = scrubber._post_process_filth_list(filth_list)
     dirty_words = [filth.text for filth in filth_list]
     return dirty_words
 
 
-def redact_pdf(bytes: bytes, redaction_strategies: List[RedactionStrategy]):
+PREVIEW_MEDIA_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+@dataclass
+class PagePreview:
+    page: int
+    width: int
+    height: int
+    bytes: bytes = field(repr=False)
+    # the rendered page in fitz points, and the matrix taking the coordinates
+    # of find_text_coordinates onto it
+    page_width: float = 0.0
+    page_height: float = 0.0
+    page_matrix: Tuple[float, ...] = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def render_previews(
+    bytes: bytes,
+    widths: List[int],
+    image_format: str = "png",
+    max_pages: Optional[int] = None,
+) -> List[PagePreview]:
+    """Renders the first ``max_pages`` pages at each of ``widths`` pixels wide."""
+    import fitz
+
+    if image_format not in PREVIEW_MEDIA_TYPES:
+        raise ValueError(f"Unsupported preview format {image_format!r}")
+    previews = []
+    with fitz.Document(stream=bytes, filetype="pdf") as pdf:
+        for page in pdf.pages(0, min(pdf.page_count, max_pages or pdf.page_count)):
+            page_matrix = tuple(text_to_page_matrix(page))
+            for width in widths:
+                zoom = width / page.rect.width
+                pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                previews.append(
+                    PagePreview(
+                        page=page.number,
+                        width=width,
+                        height=pixmap.height,
+                        bytes=_encode_pixmap(pixmap, image_format),
+                        page_width=page.rect.width,
+                        page_height=page.rect.height,
+                        page_matrix=page_matrix,
+                    )
+                )
+    return previews
+
+
+def _encode_pixmap(pixmap, image_format: str) -> bytes:
+    if image_format == "png":
+        return pixmap.tobytes("png")
+    if image_format == "jpeg":
+        return pixmap.tobytes("jpeg", jpg_quality=85)
+    # fitz can't write webp
+    from PIL import Image
+
+    image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    out_stream = io.BytesIO()
+    image.save(out_stream, "WEBP", quality=85)
+    return out_stream.getvalue()
+
+
+@dataclass
+class RedactionResult:
+    bytes: bytes = field(repr=False)
+    text: str = field(repr=False)
+    # (width, height) of every page
+    page_sizes: List[Tuple[float, float]]
+    # (x0, y0, x1, y1) rects blacked out on every page, in the space of
+    # find_text_coordinates
+    redacted_rects: List[List[Tuple[float, float, float, float]]] = field(repr=False)
+    # by output optimization
+    bytes_saved: int = 0
+    # pages and saves strategies skipped for having nothing to redact
+    pages_skipped: int = 0
+    saves_skipped: int = 0
+
+
+def redact_pdf(
+    bytes: bytes,
+    redaction_strategies: List[RedactionStrategy],
+    return_result: bool = False,
+    parallel: bool = False,
+    workers: int = 1,
+    min_pages_per_shard: int = 4,
+):
+    if parallel:
+        shards = page_shards(bytes, workers, min_pages_per_shard)
+        if len(shards) > 1:
+            result = _redact_pdf_sharded(bytes, redaction_strategies, shards)
+            return result if return_result else result.bytes
+
+    if return_result and redaction_strategies:
+        redaction_strategies[-1].capture_output = True
     out_bytes = reduce(lambda acc, strat: strat.apply(acc), redaction_strategies, bytes)
-    return out_bytes
+    if not return_result:
+        return out_bytes
+
+    if redaction_strategies and redaction_strategies[-1].output_text is not None:
+        text = redaction_strategies[-1].output_text
+        page_sizes = redaction_strategies[-1].output_page_sizes
+    else:
+        import fitz
+
+        with fitz.Document(stream=out_bytes, filetype="pdf") as pdf:
+            text, page_sizes = read_output(pdf)
+
+    return RedactionResult(
+        bytes=out_bytes,
+        text=text,
+        page_sizes=page_sizes,
+        redacted_rects=_merge_redacted_rects(
+            getattr(strategy, "redacted_rects", []) for strategy in redaction_strategies
+        ),
+        bytes_saved=sum(
+            getattr(strategy, "bytes_saved", 0) for strategy in redaction_strategies
+        ),
+        pages_skipped=sum(
+            getattr(strategy, "pages_skipped", 0) for strategy in redaction_strategies
+        ),
+        saves_skipped=sum(
+            getattr(strategy, "save_skipped", False)
+            for strategy in redaction_strategies
+        ),
+    )
+
+
+def _merge_redacted_rects(strategy_rects) -> list:
+    # the rects every strategy blacked out, per page
+    redacted_rects = []
+    for rects in strategy_rects:
+        for page_number, page_rects in enumerate(rects):
+            if page_number == len(redacted_rects):
+                redacted_rects.append([])
+            redacted_rects[page_number].extend(page_rects)
+    return redacted_rects
+
+
+def page_shards(bytes: bytes, workers: int, min_pages_per_shard: int):
+    import fitz
+
+    with fitz.Document(stream=bytes, filetype="pdf") as pdf:
+        page_count = pdf.page_count
+    shard_count = min(workers, page_count // max(min_pages_per_shard, 1))
+    if shard_count <= 1:
+        return [(0, page_count)]
+    pages_per_shard = math.ceil(page_count / shard_count)
+    return [
+        (start, min(start + pages_per_shard, page_count))
+        for start in range(0, page_count, pages_per_shard)
+    ]
+
+
+def _redact_shard(bytes: bytes, start: int, stop: int, redaction_strategies):
+    # the whole document is redacted in every shard, but only its page range,
+    # so links and images are found just like in a serial run
+    for strategy in redaction_strategies:
+        strategy.pages = (start, stop)
+    out_bytes = reduce(lambda acc, strat: strat.apply(acc), redaction_strategies, bytes)
+    return out_bytes, redaction_strategies
+
+
+def address_space_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[0])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _shard_memory_limit(shard_count: int):
+    # RLIMIT_AS is per process and inherited: left alone, every shard could
+    # grow by the whole headroom of the process forking them
+    soft, _ = resource.getrlimit(resource.RLIMIT_AS)
+    if soft == resource.RLIM_INFINITY:
+        return None
+    used = address_space_bytes()
+    return used + max(soft - used, 0) // shard_count
+
+
+def _limit_shard_memory(limit):
+    if limit is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _redact_pdf_sharded(bytes: bytes, redaction_strategies, shards):
+    import fitz
+
+    # the page strategies leading the list run in parallel, each worker on its
+    # own page range of the same buffer; the ranges are stitched back together
+    # in order and the rest (metadata, optimization) runs once on the result
+    split = next(
+        (
+            index
+            for index, strategy in enumerate(redaction_strategies)
+            if not isinstance(strategy, PageRedactionStrategy)
+        ),
+        len(redaction_strategies),
+    )
+    page_strategies = [
+        strategy.for_shards(bytes) for strategy in redaction_strategies[:split]
+    ]
+    with ProcessPoolExecutor(
+        max_workers=len(shards),
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_limit_shard_memory,
+        initargs=(_shard_memory_limit(len(shards)),),
+    ) as executor:
+        futures = [
+            executor.submit(_redact_shard, bytes, start, stop, page_strategies)
+            for start, stop in shards
+        ]
+        results = [future.result() for future in futures]
+
+    out = fitz.Document()
+    # insert_pdf drops the links to pages of other shards
+    cross_shard_links = []
+    with fitz.Document(stream=bytes, filetype="pdf") as pdf:
+        for (start, stop), (shard_bytes, _) in zip(shards, results):
+            with fitz.Document(stream=shard_bytes, filetype="pdf") as shard:
+                out.insert_pdf(shard, from_page=start, to_page=stop - 1)
+                cross_shard_links.extend(
+                    (page_number, link)
+                    for page_number in range(start, stop)
+                    for link in shard[page_number].get_links()
+                    if link["kind"] == fitz.LINK_GOTO
+                    and not start <= link["page"] < stop
+                )
+        for page_number, link in cross_shard_links:
+            out[page_number].insert_link(link)
+        # and copies no document level objects
+        out.set_toc(pdf.get_toc(simple=False))
+        out.set_metadata(pdf.metadata)
+        if pdf.xref_xml_metadata():
+            out.set_xml_metadata(pdf.get_xml_metadata())
+    merged_bytes = out.tobytes(deflate=True, garbage=3)
+    out.close()
+    result = redact_pdf(merged_bytes, redaction_strategies[split:], return_result=True)
+
+    shard_strategies = [strategies for _, strategies in results]
+    return RedactionResult(
+        bytes=result.bytes,
+        text=result.text,
+        page_sizes=result.page_sizes,
+        redacted_rects=_merge_redacted_rects(
+            [
+                [
+                    rects
+                    for strategies in shard_strategies
+                    for rects in strategies[index].redacted_rects
+                ]
+                for index in range(split)
+            ]
+            + [result.redacted_rects]
+        ),
+        bytes_saved=result.bytes_saved,
+        pages_skipped=result.pages_skipped
+        + sum(
+            strategy.pages_skipped
+            for strategies in shard_strategies
+            for strategy in strategies
+        ),
+        saves_skipped=result.saves_skipped
+        + sum(
+            all(strategies[index].save_skipped for strategies in shard_strategies)
+            for index in range(split)
+        ),
+    )
 
 
 def find_text_coordinates(
     bytes: bytes, resume_id: int = None, redacted=False
 ) -> List[TextCoordinates]:
+    from pdfminer.layout import LAParams, LTText, LTChar, LTAnno
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.converter import PDFPageAggregator
+
     stream = io.BytesIO(bytes)
     manager = PDFResourceManager()
     laparams = LAParams()
@@ -171,6 +500,8 @@ def find_text_coordinates(
 
 
 def resume_measurer(blob: bytes):
+    from pdfminer.pdfpage import PDFPage
+
     stream = io.BytesIO(blob)
     pages = PDFPage.get_pages(stream)
 
@@ -1,12 +1,18 @@
 import abc
-import fitz
+import copy
+import functools
+import importlib.util
 import io
-from pdfminer.high_level import extract_text
-import scrubadub
-import scrubadub_stanford
-import nltk
+import logging
 import os
+from typing import Iterable, Iterator, List, Tuple
 
+# fitz, pdfminer, scrubadub and nltk are imported where they are used, so this
+# module can be imported without paying for them
+
+logger = logging.getLogger(__name__)
+
+NLTK_DATA_PATH = "./nltk/nltk_data"
 STANFORD_DATA_PATH = "./nltk/stanford-ner-4.0.0"
 
 STANFORD_CLASSIFIER_PATH = os.path.join(
@@ -16,183 +22,540 @@ STANFORD_CLASSIFIER_PATH = os.path.join(
 )
 STANFORD_NER_JAR_PATH = os.path.join(STANFORD_DATA_PATH, "stanford-ner.jar")
 
+# fitz's subset_fonts needs fontTools; looked up once (without importing it)
+# rather than failing on every document
+FONTTOOLS_AVAILABLE = importlib.util.find_spec("fontTools") is not None
+if not FONTTOOLS_AVAILABLE:
+    logger.warning("fontTools not installed, redacted PDFs keep their full fonts")
 
-class CachedStanfordEntityDetector(scrubadub_stanford.detectors.StanfordEntityDetector):
-    def __init__(
-        self,
-        enable_person: bool = True,
-        enable_organization: bool = True,
-        enable_location: bool = False,
-        **kwargs
+
+@functools.lru_cache(maxsize=None)
+def _cached_stanford_entity_detector_class():
+    import nltk
+    import scrubadub_stanford
+
+    class CachedStanfordEntityDetector(
+        scrubadub_stanford.detectors.StanfordEntityDetector
     ):
-        """Initialise the ``Detector``.
-
-        :param name: Overrides the default name of the :class:``Detector``
-        :type name: str, optional
-        :param locale: The locale of the documents in the format: 2 letter lower-case language code followed by an
-                       underscore and the two letter upper-case country code, eg "en_GB" or "de_CH".
-        :type locale: str, optional
-        """
-        super().__init__(enable_person, enable_organization, enable_location, **kwargs)
-        self.stanford_tagger = nltk.tag.StanfordNERTagger(
-            STANFORD_CLASSIFIER_PATH, STANFORD_NER_JAR_PATH
-        )
+        def __init__(
+            self,
+            enable_person: bool = True,
+            enable_organization: bool = True,
+            enable_location: bool = False,
+            **kwargs
+        ):
+            """Initialise the ``Detector``.
+
+            :param name: Overrides the default name of the :class:``Detector``
+            :type name: str, optional
+            :param locale: The locale of the documents in the format: 2 letter lower-case language code followed by an
+                           underscore and the two letter upper-case country code, eg "en_GB" or "de_CH".
+            :type locale: str, optional
+            """
+            super().__init__(
+                enable_person, enable_organization, enable_location, **kwargs
+            )
+            self.stanford_tagger = nltk.tag.StanfordNERTagger(
+                STANFORD_CLASSIFIER_PATH, STANFORD_NER_JAR_PATH
+            )
+
+    return CachedStanfordEntityDetector
+
+
+@functools.lru_cache(maxsize=None)
+def punkt_tokenizer():
+    # the bundled punkt models, nltk's downloader isn't used at runtime
+    import nltk
+
+    if NLTK_DATA_PATH not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_PATH)
+    return nltk.data.load("tokenizers/punkt/PY3/english.pickle")
+
+
+def iter_sentence_chunks(
+    pages: Iterable[str], max_chars: int = 5000, overlap_sentences: int = 1
+) -> Iterator[Tuple[int, str, bool]]:
+    """Splits the text of each page into chunks of whole sentences.
+
+    Yields ``(page_number, chunk, page_done)``; ``page_done`` is set on the
+    last chunk of a page. Every chunk starts with the last ``overlap_sentences``
+    sentences of the one before, also across pages, so an entity split by a
+    chunk boundary is seen whole in one of them.
+    """
+    tokenizer = punkt_tokenizer()
+    carried = []
+    for page_number, text in enumerate(pages):
+        sentences = list(carried)
+        size = sum(len(sentence) for sentence in sentences)
+        fresh = 0
+        for sentence in tokenizer.tokenize(text):
+            if fresh and size + len(sentence) > max_chars:
+                yield page_number, " ".join(sentences), False
+                sentences = sentences[-overlap_sentences:] if overlap_sentences else []
+                size = sum(len(sentence) for sentence in sentences)
+                fresh = 0
+            sentences.append(sentence)
+            size += len(sentence)
+            fresh += 1
+        # a page without text of its own has nothing new to tag
+        yield page_number, " ".join(sentences) if fresh else "", True
+        carried = sentences[-overlap_sentences:] if overlap_sentences else []
+
+
+def iter_dirty_words(
+    chunks: Iterable[Tuple[int, str, bool]], scrubber
+) -> Iterator[Tuple[int, List[str], bool]]:
+    """Tags chunks one at a time, yielding the words not seen in earlier ones."""
+    seen = set()
+    for page_number, chunk, page_done in chunks:
+        if not chunk.strip():
+            yield page_number, [], page_done
+            continue
+        filth_list = list(scrubber.iter_filth(chunk, document_name=None))
+        filth_list = scrubber._post_process_filth_list(filth_list)
+        new_words = []
+        for filth in filth_list:
+            if filth.text not in seen:
+                seen.add(filth.text)
+                new_words.append(filth.text)
+        yield page_number, new_words, page_done
+
+
+def __getattr__(name):
+    if name == "CachedStanfordEntityDetector":
+        return _cached_stanford_entity_detector_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class RedactionStrategy(abc.ABC):
+    # when set, the strategy keeps the text and page sizes of its output,
+    # read from the open document right before it is saved
+    capture_output = False
+    output_text = None
+    output_page_sizes = None
+
     @abc.abstractmethod
     def apply(self, bytes: bytes) -> bytes:
         raise NotImplementedError
 
+    def for_shards(self, bytes: bytes) -> "RedactionStrategy":
+        # the strategy to apply to page ranges split off this document;
+        # strategies that look at the whole document settle that here
+        return self
+
+    def _save(self, pdf) -> bytes:
+        if self.capture_output:
+            self.output_text, self.output_page_sizes = read_output(pdf)
+        return _save(pdf)
+
+
+def _iter_layout_texts(item) -> Iterator[str]:
+    # the text of pdfminer's TextConverter.receive_layout, so figures (form
+    # XObjects) are scanned as well as the page's own text boxes
+    from pdfminer.layout import LTContainer, LTText, LTTextBox
+
+    if isinstance(item, LTContainer):
+        for child in item:
+            yield from _iter_layout_texts(child)
+    elif isinstance(item, LTText):
+        yield item.get_text()
+    if isinstance(item, LTTextBox):
+        yield "\n"
+
+
+def read_output(pdf):
+    # pages joined by form feeds, like pdfminer's extract_text
+    text = "".join(page.get_text("text") + "\f" for page in pdf.pages())
+    text = text.replace("\x00", "")
+    page_sizes = [(page.rect.width, page.rect.height) for page in pdf.pages()]
+    return text, page_sizes
+
+
+def _save(pdf) -> bytes:
+    out_stream = io.BytesIO()
+    pdf.save(out_stream, deflate=True, garbage=3)
+    pdf.close()
+    out_stream.seek(0, 0)
+    out_bytes = out_stream.read()
+    out_stream.close()
+    return out_bytes
+
+
+def text_to_page_matrix(page, rotated: bool = True):
+    """The matrix from pdfminer's page space to fitz's space of ``page``.
+
+    pdfminer rotates the media box into a bottom-left origin. fitz shows the
+    crop box, clipped to the media box, with a top-left origin: turned
+    clockwise by the page rotation in ``page.rect`` and previews, unrotated
+    in the rects of its text, links, images and annotations. fitz's
+    ``mediabox`` is in PDF space, its ``cropbox`` y-flipped under the media
+    box top.
+    """
+    import fitz
+
+    x0, y0, x1, y1 = page.mediabox
+    # as pdfminer's PDFPageInterpreter.process_page
+    pdfminer = {
+        90: (0, -1, 1, 0, -y0, x1),
+        180: (-1, 0, 0, -1, x1, y1),
+        270: (0, 1, -1, 0, y1, -x0),
+    }.get(page.rotation, (1, 0, 0, 1, -x0, -y0))
+    cropbox = page.cropbox & fitz.Rect(x0, 0, x1, y1 - y0)
+    matrix = ~fitz.Matrix(pdfminer) * fitz.Matrix(
+        1, 0, 0, -1, -cropbox.x0, y1 - cropbox.y0
+    )
+    if not rotated:
+        return matrix
+    width, height = cropbox.width, cropbox.height
+    rotation = {
+        90: (0, 1, -1, 0, height, 0),
+        180: (-1, 0, 0, -1, width, height),
+        270: (0, -1, 1, 0, 0, width),
+    }.get(page.rotation, (1, 0, 0, 1, 0, 0))
+    return matrix * fitz.Matrix(rotation)
+
+
+def _pdf_rect(page, area) -> tuple:
+    import fitz
+
+    rect = area.rect if isinstance(area, fitz.Quad) else fitz.Rect(area)
+    # into the space of find_text_coordinates, which TextCoordinates are in
+    rect = rect * ~text_to_page_matrix(page, rotated=False)
+    return (rect.x0, rect.y0, rect.x1, rect.y1)
+
+
+class PageRedactionStrategy(RedactionStrategy):
+    """Blacks out the areas ``_find_areas`` returns on each page.
+
+    After ``apply`` the redacted areas are kept in ``redacted_rects``, one list
+    of ``(x0, y0, x1, y1)`` tuples per page, in the space of
+    ``find_text_coordinates``. With ``pages`` set to ``(start, stop)`` only
+    that range is redacted, and ``redacted_rects`` has its pages alone.
+    """
+
+    pages = None
+
+    def __init__(self):
+        self.redacted_rects = []
+        self.pages_skipped = 0
+        self.save_skipped = False
 
-class Top30Percent(RedactionStrategy):
-    def apply(self, bytes: bytes) -> bytes:
-        pdf = fitz.Document(stream=bytes, filetype="pdf")
-        for page in pdf.pages():
-            # clean the resume
-            page.clean_contents()
-
-            # strip top 30% of page
-            page_bound = page.bound()
-            top_thirty = page_bound.transform(
-                fitz.Matrix(fitz.Identity).pretranslate(0, -page_bound.height * 0.7)
-            )
-            for word in page.get_text("words", clip=top_thirty):
-                page.add_redact_annot(fitz.Rect(word[:4]), fill=(0, 0, 0))
+    @abc.abstractmethod
+    def _find_areas(self, page) -> list:
+        raise NotImplementedError
 
-            page.apply_redactions()
-        out_stream = io.BytesIO()
-        pdf.save(out_stream, deflate=True, garbage=3)
-        pdf.close()
-        out_stream.seek(0, 0)
-        out_bytes = out_stream.read()
-        out_stream.close()
-        return out_bytes
+    def _apply_redactions(self, page):
+        page.apply_redactions()
 
+    def _redact_page(self, page, areas) -> list:
+        # clean the resume
+        page.clean_contents()
+
+        page_rects = []
+        for area in areas:
+            page.add_redact_annot(area, fill=(0, 0, 0))
+            page_rects.append(_pdf_rect(page, area))
+        self._apply_redactions(page)
+        return page_rects
 
-class Bottom10Percent(RedactionStrategy):
     def apply(self, bytes: bytes) -> bytes:
+        import fitz
+
+        self.redacted_rects = []
+        self.pages_skipped = 0
+        self.save_skipped = False
         pdf = fitz.Document(stream=bytes, filetype="pdf")
-        for page in pdf.pages():
-            # clean the resume
-            page.clean_contents()
-
-            # strip bottom 10% of page
-            page_bound = page.bound()
-            bottom_ten = page_bound.transform(
-                fitz.Matrix(fitz.Identity).pretranslate(0, page_bound.height * 0.9)
-            )
-            for word in page.get_text("words", clip=bottom_ten):
-                page.add_redact_annot(fitz.Rect(word[:4]), fill=(0, 0, 0))
+        for page in pdf.pages(*(self.pages or ())):
+            areas = self._find_areas(page)
+            if not areas:
+                # cleaning and applying both rewrite the content streams
+                self.redacted_rects.append([])
+                self.pages_skipped += 1
+                continue
+
+            self.redacted_rects.append(self._redact_page(page, areas))
+        if self.pages_skipped == len(self.redacted_rects):
+            # nothing changed, the input is already this strategy's output
+            self.save_skipped = True
+            if self.capture_output:
+                self.output_text, self.output_page_sizes = read_output(pdf)
+            pdf.close()
+            return bytes
+        return self._save(pdf)
+
+
+class Top30Percent(PageRedactionStrategy):
+    def _find_areas(self, page) -> list:
+        import fitz
+
+        # strip top 30% of page
+        page_bound = page.bound()
+        top_thirty = page_bound.transform(
+            fitz.Matrix(fitz.Identity).pretranslate(0, -page_bound.height * 0.7)
+        )
+        return [fitz.Rect(word[:4]) for word in page.get_text("words", clip=top_thirty)]
 
-            page.apply_redactions()
-        out_stream = io.BytesIO()
-        pdf.save(out_stream, deflate=True, garbage=3)
-        pdf.close()
-        out_stream.seek(0, 0)
-        out_bytes = out_stream.read()
-        out_stream.close()
-        return out_bytes
 
+class Bottom10Percent(PageRedactionStrategy):
+    def _find_areas(self, page) -> list:
+        import fitz
 
-class LinkRedactor(RedactionStrategy):
-    def apply(self, bytes: bytes) -> bytes:
-        pdf = fitz.Document(stream=bytes, filetype="pdf")
-        for page in pdf.pages():
-            # clean the resume
-            page.clean_contents()
+        # strip bottom 10% of page
+        page_bound = page.bound()
+        bottom_ten = page_bound.transform(
+            fitz.Matrix(fitz.Identity).pretranslate(0, page_bound.height * 0.9)
+        )
+        return [fitz.Rect(word[:4]) for word in page.get_text("words", clip=bottom_ten)]
 
-            # strip links
-            for link in page.get_links():
-                page.delete_link(link)
-                page.add_redact_annot(link["from"], fill=(0, 0, 0))
 
-            page.apply_redactions()
-        out_stream = io.BytesIO()
-        pdf.save(out_stream, deflate=True, garbage=3)
-        pdf.close()
-        out_stream.seek(0, 0)
-        out_bytes = out_stream.read()
-        out_stream.close()
-        return out_bytes
+class LinkRedactor(PageRedactionStrategy):
+    def _find_areas(self, page) -> list:
+        # strip links
+        if not page.first_link:
+            return []
+        areas = []
+        for link in page.get_links():
+            page.delete_link(link)
+            areas.append(link["from"])
+        return areas
 
 
-class ImageRedactor(RedactionStrategy):
-    def apply(self, bytes: bytes) -> bytes:
-        pdf = fitz.Document(stream=bytes, filetype="pdf")
-        for page in pdf.pages():
-            # clean the resume
-            page.clean_contents()
+class ImageRedactor(PageRedactionStrategy):
+    def _apply_redactions(self, page):
+        import fitz
 
-            # redact images
-            for image in page.get_images():
-                redacted_rects = page.get_image_rects(image)
-                for rect in redacted_rects:
-                    page.add_redact_annot(rect, fill=(0, 0, 0))
+        # the images are covered whole, drop them from the page instead of
+        # blanking their pixels, so garbage collection can remove them
+        page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_REMOVE)
 
-            page.apply_redactions()
-        out_stream = io.BytesIO()
-        pdf.save(out_stream, deflate=True, garbage=3)
-        pdf.close()
-        out_stream.seek(0, 0)
-        out_bytes = out_stream.read()
-        out_stream.close()
-        return out_bytes
+    def _find_areas(self, page) -> list:
+        # redact images
+        images = page.get_images()
+        if not images:
+            return []
+        areas = []
+        for image in images:
+            areas.extend(page.get_image_rects(image))
+        return areas
 
 
 class MetadataRedactor(RedactionStrategy):
+    """Clears the info dictionary and drops the XMP metadata stream.
+
+    Only the metadata objects change, so the document is written out as is:
+    no recompression, and garbage=1 just to drop the orphaned old objects,
+    which would otherwise still carry the metadata.
+    """
+
+    def __init__(self):
+        self.save_skipped = False
+
     def apply(self, bytes: bytes) -> bytes:
+        import fitz
+
+        self.save_skipped = False
         pdf = fitz.Document(stream=bytes, filetype="pdf")
+        has_info = any(
+            value
+            for key, value in pdf.metadata.items()
+            if key not in ("format", "encryption")
+        )
+        if not has_info and not pdf.xref_xml_metadata():
+            self.save_skipped = True
+            if self.capture_output:
+                self.output_text, self.output_page_sizes = read_output(pdf)
+            pdf.close()
+            return bytes
         pdf.set_metadata({})
+        pdf.del_xml_metadata()
+        if self.capture_output:
+            self.output_text, self.output_page_sizes = read_output(pdf)
+        out_stream = io.BytesIO()
+        pdf.save(out_stream, garbage=1)
+        pdf.close()
+        return out_stream.getvalue()
+
+
+class OutputOptimizer(RedactionStrategy):
+    """Shrinks the redacted output: subsets fonts, drops unused and duplicate
+    objects and recompresses every stream.
+
+    Keeps the input if that turns out smaller; ``bytes_saved`` has the result.
+    """
+
+    def __init__(self):
+        self.bytes_saved = 0
+
+    def apply(self, bytes: bytes) -> bytes:
+        import fitz
+
+        pdf = fitz.Document(stream=bytes, filetype="pdf")
+        if FONTTOOLS_AVAILABLE:
+            try:
+                pdf.subset_fonts()
+            except Exception as e:
+                # some embedded fonts can't be subset
+                logger.info("Could not subset fonts: %s", e)
+        if self.capture_output:
+            self.output_text, self.output_page_sizes = read_output(pdf)
         out_stream = io.BytesIO()
-        pdf.save(out_stream, deflate=True, garbage=3)
+        pdf.save(
+            out_stream,
+            garbage=4,
+            clean=True,
+            deflate=True,
+            deflate_images=True,
+            deflate_fonts=True,
+        )
         pdf.close()
-        out_stream.seek(0, 0)
-        out_bytes = out_stream.read()
-        out_stream.close()
+        out_bytes = out_stream.getvalue()
+        if len(out_bytes) >= len(bytes):
+            self.bytes_saved = 0
+            return bytes
+        self.bytes_saved = len(bytes) - len(out_bytes)
         return out_bytes
 
 
-class StanfordRedactor(RedactionStrategy):
-    def __init__(self, **kwargs):
+class StanfordRedactor(PageRedactionStrategy):
+    """Redacts the people and organizations Stanford NER finds in the text.
+
+    The text is read page by page and tagged in sentence chunks of about
+    ``chunk_chars`` characters, so the tagger never holds the whole document.
+    Each page is redacted once its own text is tagged; words only found
+    further on are redacted on the earlier pages afterwards. Every chunk is a
+    tagger run, so smaller chunks trade speed for memory. ``streaming=False``
+    tags the whole text at once instead.
+    """
+
+    def __init__(
+        self,
+        streaming: bool = True,
+        chunk_chars: int = 5000,
+        overlap_sentences: int = 1,
+        **kwargs
+    ):
+        super().__init__()
+        self.streaming = streaming
+        self.chunk_chars = chunk_chars
+        self.overlap_sentences = overlap_sentences
         self.stanford_entity_detector_kwargs = kwargs
+        self.dirty_words = []
+        self._document_dirty_words = None
+        self._dirty_word_stream = None
 
     def _get_text(self, bytes: bytes):
+        from pdfminer.high_level import extract_text
+
         stream = io.BytesIO(bytes)
         text = extract_text(stream)
         stream.close()
         text = text.replace("\x00", "")
         return text
 
-    def _find_dirty_words(self, text) -> list[str]:
+    def _iter_page_texts(self, bytes: bytes) -> Iterator[str]:
+        from pdfminer.high_level import extract_pages
+
+        stream = io.BytesIO(bytes)
+        try:
+            for page_layout in extract_pages(stream):
+                yield "".join(_iter_layout_texts(page_layout)).replace("\x00", "")
+        finally:
+            stream.close()
+
+    def _scrubber(self):
+        import scrubadub
+
         scrubber = scrubadub.Scrubber()
-        scrubber.add_detector(
-            CachedStanfordEntityDetector(**self.stanford_entity_detector_kwargs)
-        )
+        detector_class = _cached_stanford_entity_detector_class()
+        scrubber.add_detector(detector_class(**self.stanford_entity_detector_kwargs))
+        return scrubber
+
+    def _find_dirty_words(self, text) -> list[str]:
+        if self.streaming:
+            chunks = iter_sentence_chunks(
+                [text], self.chunk_chars, self.overlap_sentences
+            )
+            return [
+                word
+                for _, words, _ in iter_dirty_words(chunks, self._scrubber())
+                for word in words
+            ]
+        scrubber = self._scrubber()
         filth_list = list(scrubber.iter_filth(text, document_name=None))
         filth_list = scrubber._post_process_filth_list(filth_list)
         dirty_words = [filth.text for filth in filth_list]
         return dirty_words
 
-    def apply(self, bytes: bytes) -> bytes:
-        dirty_text = self._get_text(bytes)
-        dirty_words = self._find_dirty_words(dirty_text)
+    def _pull_dirty_words(self, through_page: int = None):
+        # tags until the text of through_page is done, or everything if None
+        for page_number, words, page_done in self._dirty_word_stream:
+            self.dirty_words.extend(words)
+            if through_page is not None and page_number >= through_page and page_done:
+                return
+
+    def _find_areas(self, page, dirty_words=None) -> list:
+        if dirty_words is None:
+            if self._dirty_word_stream is not None:
+                self._pull_dirty_words(page.number)
+                self._searched_words[page.number] = len(self.dirty_words)
+            dirty_words = self.dirty_words
+        # redact words
+        areas = []
+        for dirty_word in dirty_words:
+            areas.extend(page.search_for(dirty_word, quads=True))
+        return areas
+
+    def for_shards(self, bytes: bytes) -> "StanfordRedactor":
+        # entities are found in the whole text, not per page range
+        strategy = copy.copy(self)
+        strategy._document_dirty_words = self._find_dirty_words(self._get_text(bytes))
+        return strategy
 
-        pdf = fitz.Document(stream=bytes, filetype="pdf")
-        for page in pdf.pages():
-            # clean the resume
-            page.clean_contents()
-
-            # redact words
-            for dirty_word in dirty_words:
-                redacted_quads = page.search_for(dirty_word, quads=True)
-                for quad in redacted_quads:
-                    page.add_redact_annot(quad, fill=(0, 0, 0))
-            page.apply_redactions()
-        out_stream = io.BytesIO()
-        pdf.save(out_stream, deflate=True, garbage=3)
-        pdf.close()
-        out_stream.seek(0, 0)
-        out_bytes = out_stream.read()
-        out_stream.close()
-        return out_bytes
+    def apply(self, bytes: bytes) -> bytes:
+        if self._document_dirty_words is not None:
+            self.dirty_words = self._document_dirty_words
+        elif self.streaming:
+            return self._apply_streaming(bytes)
+        else:
+            dirty_text = self._get_text(bytes)
+            self.dirty_words = self._find_dirty_words(dirty_text)
+        return super().apply(bytes)
+
+    def _apply_streaming(self, bytes: bytes) -> bytes:
+        import fitz
+
+        self.dirty_words = []
+        self._searched_words = {}
+        chunks = iter_sentence_chunks(
+            self._iter_page_texts(bytes), self.chunk_chars, self.overlap_sentences
+        )
+        self._dirty_word_stream = iter_dirty_words(chunks, self._scrubber())
+        try:
+            out_bytes = super().apply(bytes)
+            self._pull_dirty_words()
+        finally:
+            self._dirty_word_stream = None
+
+        late_pages = {
+            page_number: self.dirty_words[searched:]
+            for page_number, searched in self._searched_words.items()
+            if searched < len(self.dirty_words)
+        }
+        if not late_pages:
+            return out_bytes
+        pdf = fitz.Document(stream=out_bytes, filetype="pdf")
+        redacted = False
+        for page_number, dirty_words in late_pages.items():
+            page = pdf[page_number]
+            areas = self._find_areas(page, dirty_words)
+            if not areas:
+                continue
+            if not self.redacted_rects[page_number]:
+                self.pages_skipped -= 1
+            self.redacted_rects[page_number].extend(self._redact_page(page, areas))
+            redacted = True
+        if not redacted:
+            pdf.close()
+            return out_bytes
+        self.save_skipped = False
+        return self._save(pdf)
@@ -1,8 +1,9 @@
+import hashlib
 from uuid import uuid4
-from flask import Flask, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from flask.views import MethodView
-from flask_smorest import Api, Blueprint
+from flask_smorest import Api, Blueprint, abort
 from flask_smorest.fields import Upload
 import marshmallow as ma
 
@@ -11,14 +12,26 @@ from common.entry_points.wsgi_middleware import ClaimsInjectorMiddleware
 from common.adapters.schemas import SingletonSchema
 from common.entry_points.error_handler import error_handler
 from resume import bootstrap, views
-from resume.domain import commands
-
-from resume.adapters import schemas
+from resume.config import (
+    get_file_store_config,
+    get_resume_cache_config,
+    get_resume_s3_config,
+    get_pdf_limits_config,
+    get_preview_config,
+    get_search_config,
+)
+from resume.domain import commands, model
+
+from resume.adapters import cache, file_store, schemas
+from resume.service_layer import unit_of_work
+from resume.service_layer.scheduler import RedactionScheduler
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
 app.wsgi_app = ClaimsInjectorMiddleware(app.wsgi_app)
 app.url_map.strict_slashes = False
+# oversized uploads are rejected before they are read
+app.config["MAX_CONTENT_LENGTH"] = get_pdf_limits_config()["max_bytes"]
 app.register_error_handler(Exception, error_handler)
 
 app.config["API_TITLE"] = "resume api"
@@ -27,7 +40,19 @@ app.config["OPENAPI_VERSION"] = "3.0.2"
 api = Api(app)
 
 
-bus = bootstrap.bootstrap()
+response_cache = cache.from_config(get_resume_cache_config())
+resume_file_store = file_store.from_config(
+    get_file_store_config(), get_resume_s3_config()
+)
+scheduler = RedactionScheduler.from_config()
+bus = bootstrap.bootstrap(
+    cache=response_cache, file_store=resume_file_store, scheduler=scheduler
+)
+preview_config = get_preview_config()
+read_uow = unit_of_work.SqlAlchemyUnitOfWork(unit_of_work.READ_ONLY_SESSION_FACTORY)
+MAX_BATCH_SIZE = 100
+MAX_SEARCH_LIMIT = 100
+
 blp = Blueprint("resume", "resumes", description="Operations on resumes")
 
 
@@ -36,6 +61,12 @@ def healthcheck():
     return "OK", 200
 
 
+@blp.route("/metrics")
+def metrics():
+    # "slots" counts every worker's redactions when admission is shared
+    return dict(pool=unit_of_work.pool_status(), scheduler=scheduler.metrics()), 200
+
+
 class CreateResumeSchema(ma.Schema):
     prospect_uuid = ma.fields.String()
     file = Upload()
@@ -59,7 +90,7 @@ class ResumesPlural(MethodView):
         )
         bus.handle(cmd)
         # bus.handle(commands.AttachTextCoordinates(uuid=uuid))
-        resume = views.get_resume(bus.uow, uuid)
+        resume = views.get_resume(read_uow, uuid)
         rv = dict()
         rv["data"] = resume
         return rv, 201
@@ -67,6 +98,20 @@ class ResumesPlural(MethodView):
 
 class GetResumeSchema(ma.Schema):
     keywords = ma.fields.String()
+    format = ma.fields.String(validate=ma.validate.OneOf(["full", "compact"]))
+    # coordinates in the pixel space of the preview this wide
+    preview_width = ma.fields.Integer(
+        validate=ma.validate.OneOf(preview_config["widths"])
+    )
+
+
+def wants_compact(get_data) -> bool:
+    if "format" in get_data:
+        return get_data["format"] == "compact"
+    best = request.accept_mimetypes.best_match(
+        ["application/json", schemas.COMPACT_MEDIA_TYPE]
+    )
+    return best == schemas.COMPACT_MEDIA_TYPE
 
 
 @blp.route("/<resume_uuid>")
@@ -74,12 +119,111 @@ class ResumesSingular(MethodView):
     @blp.arguments(GetResumeSchema, location="query")
     @blp.response(200, SingletonSchema(schemas.Resume))
     def get(self, get_data, resume_uuid):
-        resume = views.get_resume(
-            bus.uow, resume_uuid, keywords=get_data.get("keywords")
+        # served from the cache when possible, so a matching If-None-Match
+        # costs no database round-trip
+        cached = views.get_cached_resume(
+            read_uow, response_cache, resume_uuid, keywords=get_data.get("keywords")
         )
         rv = dict()
-        rv["data"] = resume
-        return rv, 201
+        if cached is None:
+            rv["data"] = None
+            return rv, 201
+        compact = wants_compact(get_data)
+        preview_width = get_data.get("preview_width")
+        etag = views.resume_etag(cached, preview_width, compact)
+        headers = {"ETag": f'"{etag}"', "Vary": "Accept"}
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+        data = cached["data"]
+        if preview_width is not None:
+            data = views.scale_text_coordinates(data, preview_width)
+        if compact:
+            rv["data"] = schemas.dump_compact_resume(data)
+            response = jsonify(rv)
+            response.status_code = 201
+            response.headers.update(headers)
+            return response
+        rv["data"] = data
+        return rv, 201, headers
+
+
+class GetPreviewSchema(ma.Schema):
+    width = ma.fields.Integer(
+        required=True, validate=ma.validate.OneOf(preview_config["widths"])
+    )
+
+
+@blp.route("/<resume_uuid>/previews/<int:page>")
+class ResumePreview(MethodView):
+    @blp.arguments(GetPreviewSchema, location="query")
+    def get(self, preview_data, resume_uuid, page):
+        link = views.get_preview_link(
+            read_uow, resume_uuid, page=page, width=preview_data["width"]
+        )
+        if link is None:
+            abort(404, message="No preview rendered")
+        # links are versioned, a revalidation only costs the lookup above
+        etag = hashlib.sha1(link.encode()).hexdigest()
+        headers = {
+            "ETag": f'"{etag}"',
+            "Cache-Control": f"public, max-age={preview_config['max_age']}",
+        }
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+        return Response(
+            resume_file_store.read(link),
+            mimetype=model.PREVIEW_MEDIA_TYPES[preview_config["image_format"]],
+            headers=headers,
+        )
+
+
+class BatchResumeSchema(ma.Schema):
+    uuids = ma.fields.List(
+        ma.fields.String(),
+        required=True,
+        validate=ma.validate.Length(min=1, max=MAX_BATCH_SIZE),
+    )
+    keywords = ma.fields.String()
+
+
+@blp.route("/batch")
+class ResumesBatch(MethodView):
+    @blp.arguments(BatchResumeSchema)
+    @blp.response(200, schemas.ResumeBatch)
+    def post(self, batch_data):
+        resumes = views.get_resumes(
+            read_uow, batch_data["uuids"], keywords=batch_data.get("keywords")
+        )
+        rv = dict()
+        rv["data"] = resumes
+        return rv, 200
+
+
+class SearchResumeSchema(ma.Schema):
+    keywords = ma.fields.String(required=True)
+    show_redacted = ma.fields.Boolean(load_default=False)
+    limit = ma.fields.Integer(
+        load_default=20, validate=ma.validate.Range(min=1, max=MAX_SEARCH_LIMIT)
+    )
+    cursor = ma.fields.String()
+
+
+@blp.route("/search")
+class ResumesSearch(MethodView):
+    @blp.arguments(SearchResumeSchema, location="query")
+    @blp.response(200, schemas.ResumeSearch)
+    def get(self, search_data):
+        try:
+            return (
+                views.search_resumes(
+                    read_uow,
+                    max_candidates=get_search_config()["max_candidates"],
+                    **search_data,
+                ),
+                200,
+            )
+        except ValueError as e:
+            abort(400, message=str(e))
 
 
 api.register_blueprint(blp, url_prefix="/resumes")
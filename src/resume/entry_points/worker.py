@@ -0,0 +1,193 @@
+"""Pre-forked redaction workers.
+
+The parent loads and warms every heavy dependency once, by running a dummy
+document through the pipeline, then forks the workers so they share the warm
+memory copy-on-write instead of each paying the first-call costs: the
+consumers handling the broker's interactive messages as well as the backfill
+workers. An outbox relay is forked alongside them when a broker is configured.
+"""
+import gc
+import logging
+import os
+import signal
+import sys
+import time
+
+from resume.config import (
+    get_processed_messages_config,
+    get_rabbitmq_consumer_config,
+    get_worker_config,
+)
+from resume.domain import model, redaction
+
+logger = logging.getLogger(__name__)
+
+
+def dummy_pdf() -> bytes:
+    import fitz
+
+    pdf = fitz.Document()
+    page = pdf.new_page()
+    page.insert_text((72, 72), "Jane Doe", fontsize=24)
+    page.insert_text((72, 400), "Python developer, Example Corp")
+    page.insert_text((72, 800), "jane.doe@example.com")
+    page.insert_link(
+        {"kind": fitz.LINK_URI, "from": fitz.Rect(72, 790, 200, 805), "uri": "x"}
+    )
+    out_bytes = pdf.tobytes()
+    pdf.close()
+    return out_bytes
+
+
+def warm(preload_cmaps=()):
+    started_at = time.perf_counter()
+
+    from pdfminer.cmapdb import CMapDB
+
+    for name in preload_cmaps:
+        CMapDB.get_unicode_map(name)
+
+    redaction.punkt_tokenizer()
+
+    try:
+        redaction.CachedStanfordEntityDetector()
+    except Exception:
+        # needs java and the NER jar, which only some images ship
+        logger.warning("Stanford NER not available, not warmed", exc_info=True)
+
+    blob = dummy_pdf()
+    model.Resume.from_bytes(bytes=blob)
+    model.find_text_coordinates(blob)
+    model.redact_pdf(
+        blob,
+        [
+            redaction.Top30Percent(),
+            redaction.Bottom10Percent(),
+            redaction.ImageRedactor(),
+            redaction.LinkRedactor(),
+            redaction.MetadataRedactor(),
+            redaction.OutputOptimizer(),
+        ],
+        return_result=True,
+    )
+    logger.info("warmed in %.2fs", time.perf_counter() - started_at)
+
+
+def serve(targets):
+    """Runs every callable of ``targets`` in its own forked child, restarting
+    the ones that exit until SIGTERM/SIGINT."""
+    # keep the warm objects out of the collector so it doesn't touch (and
+    # copy) their pages in the children
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn(target):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                target()
+            except Exception:
+                logger.exception("worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = target
+
+    def stop(signum, _):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for target in targets:
+        spawn(target)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        target = children.pop(pid, None)
+        if not stopping and target is not None:
+            logger.warning("worker %d exited with %d, restarting", pid, status)
+            spawn(target)
+
+
+def backfill(idle_sleep: float, batch_size: int = 1):
+    from resume import bootstrap
+    from resume.domain import commands
+    from resume.service_layer.scheduler import RedactionScheduler
+
+    # built in the child, so each worker gets its own database pool
+    scheduler = RedactionScheduler.from_config()
+    bus = bootstrap.bootstrap(scheduler=scheduler)
+    retention = get_processed_messages_config()
+
+    pruned_at = None
+    while True:
+        # every worker prunes, a delete finding nothing is cheap
+        if (
+            pruned_at is None
+            or time.monotonic() - pruned_at >= retention["prune_interval"]
+        ):
+            bus.handle(
+                commands.PruneProcessedMessages(
+                    older_than_seconds=retention["retention_seconds"]
+                )
+            )
+            pruned_at = time.monotonic()
+        before = scheduler.admitted(commands.BACKFILL)
+        bus.handle(commands.KickoffResumeRedaction(batch_size=batch_size))
+        if scheduler.admitted(commands.BACKFILL) == before:
+            time.sleep(idle_sleep)
+
+
+def consume(broker_config: dict):
+    from resume import bootstrap
+    from resume.adapters import broker
+    from resume.service_layer import handlers
+
+    # built in the child, so each consumer gets its own connections
+    bus = bootstrap.bootstrap(raise_errors=True)
+
+    def handle(topic, payload):
+        bus.handle(handlers.TOPIC_COMMANDS[topic](**payload))
+
+    broker.from_config(broker_config).consume(list(handlers.TOPIC_COMMANDS), handle)
+
+
+def relay(broker_config: dict, poll_interval: float):
+    from resume.adapters import broker, repository
+    from resume.service_layer import unit_of_work
+    from resume.service_layer.outbox import OutboxRelay
+
+    OutboxRelay(
+        unit_of_work.SqlAlchemyUnitOfWork(), broker.from_config(broker_config)
+    ).run(poll_interval, repository.OutboxListener(unit_of_work.get_engine()))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    config = get_worker_config()
+    broker_config = get_rabbitmq_consumer_config()
+    warm(config["preload_cmaps"])
+    targets = [
+        lambda: backfill(config["idle_sleep"], config["backfill_batch_size"])
+    ] * config["workers"]
+    if broker_config["url"]:
+        targets += [lambda: consume(broker_config)] * config["consumers"]
+        targets.append(lambda: relay(broker_config, config["relay_poll_interval"]))
+    else:
+        logger.warning("RABBITMQ_URL not set, no consumers and no outbox relay")
+    serve(targets)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
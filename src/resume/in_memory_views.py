@@ -0,0 +1,130 @@
+"""The read models of ``resume.views`` over an ``InMemoryUnitOfWork``.
+
+Keywords are matched the way ``to_tsquery('english', ...)`` is called in
+views: any of the ``_safe_keywords`` words, case-insensitively, ignoring stop
+words. There is no stemming, and the rank is the number of matching words.
+"""
+import re
+from typing import List
+
+from resume.domain.consts import STOP_WORDS
+from resume.views import _safe_keywords, decode_search_cursor, encode_search_cursor
+
+_STOP_WORDS = frozenset(STOP_WORDS)
+
+
+def _query_words(keywords: str) -> set:
+    return {
+        word.lower()
+        for word in _safe_keywords(keywords).split("|")
+        if word and word.lower() not in _STOP_WORDS
+    }
+
+
+def _matches(text: str | None, words: set) -> int:
+    if not text or not words:
+        return 0
+    return sum(1 for word in re.findall(r"\w+", text.lower()) if word in words)
+
+
+def _resume_row(resume) -> dict:
+    return dict(
+        uuid=resume.uuid, link=resume.link, width=resume.width, height=resume.height
+    )
+
+
+def _preview_page(resume) -> dict | None:
+    return resume.preview_pages[0] if resume.preview_pages else None
+
+
+def _text_coordinates(uow, resume, words: set, redacted: bool = False) -> List[dict]:
+    return [
+        dict(text=tc.text, x0=tc.x0, x1=tc.x1, y0=tc.y0, y1=tc.y1)
+        for tc in uow.resumes.list_text_coordinates(resume, redacted=redacted)
+        if _matches(tc.text, words)
+    ]
+
+
+def get_resume(uow, uuid, keywords: str | None = None):
+    with uow:
+        resume = uow.resumes.get_by_uuid(uuid)
+        if resume is None:
+            return None
+        row = _resume_row(resume)
+        row["preview_page"] = _preview_page(resume)
+        if keywords is not None:
+            row["text_coordinates"] = _text_coordinates(
+                uow, resume, _query_words(keywords)
+            )
+        else:
+            row["text_coordinates"] = []
+        return row
+
+
+def get_resumes(uow, uuids: List[str], keywords: str | None = None):
+    words = _query_words(keywords) if keywords is not None else set()
+    with uow:
+        resumes = []
+        for uuid in uuids:
+            resume = uow.resumes.get_by_uuid(uuid)
+            if resume is None:
+                continue
+            row = _resume_row(resume)
+            row["text_coordinates"] = (
+                _text_coordinates(uow, resume, words) if keywords is not None else []
+            )
+            resumes.append(row)
+        return resumes
+
+
+def get_preview_link(uow, uuid, page: int, width: int) -> str | None:
+    with uow:
+        resume = uow.resumes.get_by_uuid(uuid)
+        if resume is None or not resume.preview_links:
+            return None
+        links = resume.preview_links.get(str(width), [])
+        return links[page] if 0 <= page < len(links) else None
+
+
+def search_resumes(
+    uow,
+    keywords: str,
+    show_redacted: bool = False,
+    limit: int = 20,
+    cursor: str | None = None,
+    max_candidates: int = 1000,
+):
+    words = _query_words(keywords)
+    with uow:
+        matches = []
+        for resume in uow.resumes.resumes.values():
+            if show_redacted and not resume.show_redacted:
+                continue
+            rank = float(
+                _matches(resume.redacted_text if show_redacted else resume.text, words)
+            )
+            if rank:
+                matches.append((rank, resume.id, resume))
+        # only the newest candidates are ranked
+        matches.sort(key=lambda match: match[1], reverse=True)
+        matches = matches[:max_candidates]
+        matches.sort(key=lambda match: match[:2], reverse=True)
+        if cursor is not None:
+            matches = [
+                match for match in matches if match[:2] < decode_search_cursor(cursor)
+            ]
+        matches = matches[:limit]
+
+        resumes = []
+        for _, _, resume in matches:
+            row = _resume_row(resume)
+            row["text_coordinates"] = _text_coordinates(
+                uow, resume, words, redacted=show_redacted
+            )
+            resumes.append(row)
+
+    next_cursor = None
+    if len(matches) == limit:
+        rank, id, _ = matches[-1]
+        next_cursor = encode_search_cursor(rank, id)
+    return dict(data=resumes, next_cursor=next_cursor)
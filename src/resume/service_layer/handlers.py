@@ -1,13 +1,30 @@
+import logging
 from uuid import uuid4
-from typing import Callable
-from common.adapters.file_store import AbstractFileStore
-from resume.domain import commands, events, model, redaction
-from resume.service_layer import unit_of_work
-from resume.config import get_current_redaction_version
+from resume.adapters.cache import AbstractCache
+from resume.adapters.file_store import AbstractFileStore
+from resume.domain import commands, events, geometry, model, redaction
+from resume.service_layer import supervisor, unit_of_work
+from resume.service_layer.scheduler import RedactionScheduler
+from resume.config import (
+    get_current_redaction_version,
+    get_pdf_limits_config,
+    get_preview_config,
+    get_redaction_parallelism_config,
+)
+
+logger = logging.getLogger(__name__)
 
 CURRENT_REDACTION_VERSION = get_current_redaction_version()
 
 
+def redaction_key(uuid: str) -> str:
+    return f"redact_resume:{uuid}:v{CURRENT_REDACTION_VERSION}"
+
+
+def text_coordinates_key(uuid: str) -> str:
+    return f"attach_text_coordinates:{uuid}"
+
+
 def create_resume(
     cmd: commands.CreateResume,
     uow: unit_of_work.AbstractUnitOfWork,
@@ -15,14 +32,34 @@ def create_resume(
 ):
     with uow:
         prospect_id = uow.prospects.get_by_uuid(cmd.prospect_uuid).id
+        supervisor.check_pdf_limits(cmd.resume_bytes)
         link = file_store.write(f"{cmd.uuid}.pdf", cmd.resume_bytes)
-        resume = model.Resume.from_bytes(
+        resume = supervisor.run_stage(
+            "parse",
+            model.Resume.from_bytes,
             bytes=cmd.resume_bytes,
+            max_chars_per_page=get_pdf_limits_config()["max_chars_per_page"],
             link=link,
             # prospect_id=prospect_id,
             uuid=cmd.uuid,
         )
         uow.resumes.add(resume)
+        # written in the resume's transaction, published by the outbox relay
+        uow.outbox.add(
+            "resume.redact_resume",
+            {
+                "uuid": resume.uuid,
+                "priority": commands.INTERACTIVE,
+                "idempotency_key": redaction_key(resume.uuid),
+            },
+        )
+        uow.outbox.add(
+            "resume.attach_text_coordinates",
+            {
+                "uuid": resume.uuid,
+                "idempotency_key": text_coordinates_key(resume.uuid),
+            },
+        )
         uow.commit()
 
         resume.events.append(events.ResumeCreated(uuid=resume.uuid))
@@ -32,66 +69,178 @@ def attach_text_coordinates(
     cmd: commands.AttachTextCoordinates,
     uow: unit_of_work.AbstractUnitOfWork,
     file_store: AbstractFileStore,
+    cache: AbstractCache,
 ):
     with uow:
-        resume = uow.resumes.get_by_uuid(cmd.uuid)
+        resume = uow.resumes.get_by_uuid(cmd.uuid, fields=["uuid", "link"])
+        if uow.resumes.has_text_coordinates(resume):
+            logger.info("text coordinates of %s already attached", resume.uuid)
+            return
         resume_bytes = file_store.read(resume.link)
-        text_coordinates = model.find_text_coordinates(
-            bytes=resume_bytes, resume_id=resume.id
+        text_coordinates = supervisor.run_stage(
+            "coordinates",
+            model.find_text_coordinates,
+            bytes=resume_bytes,
+            resume_id=resume.id,
         )
-        resume.set_text_coordinates(text_coordinates)
-        uow.resumes.add(resume)
+        uow.resumes.replace_text_coordinates(resume, text_coordinates)
         uow.commit()
+    cache.invalidate(cmd.uuid)
 
 
 def attach_redacted_text_coordinates(
     evt: events.ResumeRedacted,
     uow: unit_of_work.AbstractUnitOfWork,
     file_store: AbstractFileStore,
+    cache: AbstractCache,
+):
+    with uow:
+        resume = uow.resumes.get_by_uuid(evt.uuid, fields=["uuid", "redacted_link"])
+        original_text_coordinates = uow.resumes.list_text_coordinates(resume)
+        if evt.redacted_rects is not None and original_text_coordinates:
+            text_coordinates = geometry.filter_redacted_text_coordinates(
+                original_text_coordinates, evt.redacted_rects, resume_id=resume.id
+            )
+        else:
+            # no geometry to go on, parse the redacted document instead
+            redacted_resume_bytes = file_store.read(resume.redacted_link)
+            text_coordinates = supervisor.run_stage(
+                "coordinates",
+                model.find_text_coordinates,
+                bytes=redacted_resume_bytes,
+                resume_id=resume.id,
+                redacted=True,
+            )
+        # replaced rather than appended, so redacting again at a new
+        # REDACTION_VERSION doesn't pile up stale redacted coordinates
+        uow.resumes.replace_text_coordinates(resume, text_coordinates, redacted=True)
+        uow.commit()
+    cache.invalidate(evt.uuid)
+
+
+def render_redacted_previews(
+    evt: events.ResumeRedacted,
+    uow: unit_of_work.AbstractUnitOfWork,
+    file_store: AbstractFileStore,
+    cache: AbstractCache,
 ):
+    config = get_preview_config()
     with uow:
-        resume = uow.resumes.get_by_uuid(evt.uuid)
+        resume = uow.resumes.get_by_uuid(
+            evt.uuid,
+            fields=["uuid", "redacted_link", "preview_links", "preview_pages"],
+        )
+        # just written by redact_resume, so normally still in the file store cache
         redacted_resume_bytes = file_store.read(resume.redacted_link)
-        text_coordinates = model.find_text_coordinates(
-            bytes=redacted_resume_bytes, resume_id=resume.id, redacted=True
+        previews = supervisor.run_stage(
+            "previews",
+            model.render_previews,
+            bytes=redacted_resume_bytes,
+            widths=config["widths"],
+            image_format=config["image_format"],
+            max_pages=config["max_pages"],
         )
-        resume.add_text_coordinates(text_coordinates)
+        # versioned names, so a preview's content never changes under its link
+        preview_links = {}
+        preview_pages = {}
+        for preview in previews:
+            link = file_store.write(
+                f"previews/{resume.uuid}/v{CURRENT_REDACTION_VERSION}/"
+                f"{preview.width}/{preview.page}.{config['image_format']}",
+                preview.bytes,
+            )
+            preview_links.setdefault(str(preview.width), []).append(link)
+            preview_pages[preview.page] = dict(
+                width=preview.page_width,
+                height=preview.page_height,
+                matrix=list(preview.page_matrix),
+            )
+        resume.preview_links = preview_links
+        resume.preview_pages = [preview_pages[page] for page in sorted(preview_pages)]
         uow.resumes.add(resume)
         uow.commit()
+    # responses carry the preview page their coordinates are scaled against
+    cache.invalidate(evt.uuid)
+
+
+def invalidate_resume_cache(evt: events.ResumeRedacted, cache: AbstractCache):
+    cache.invalidate(evt.uuid)
 
 
 def kickoff_resume_redaction(
     cmd: commands.KickoffResumeRedaction,
     uow: unit_of_work.AbstractUnitOfWork,
+    file_store: AbstractFileStore,
+    scheduler: RedactionScheduler,
 ):
+    if not scheduler.backfill_ready():
+        return
     with uow:
-        resume = uow.resumes.get_without_redacted()
-        if resume is not None:
+        resumes = uow.resumes.list_without_redacted(
+            cmd.batch_size, fields=["uuid", "link", "skip_redaction"]
+        )
+        if not resumes:
+            return
+        for resume in resumes:
             resume.skip_redaction = True
             uow.resumes.add(resume)
-            uow.commit()
-            resume.events.append(commands.RedactResume(uuid=resume.uuid))
+        uow.commit()
+        # downloaded while the batch waits for its redaction slots
+        file_store.prefetch([resume.link for resume in resumes])
+        for resume in resumes:
+            resume.events.append(
+                commands.RedactResume(
+                    uuid=resume.uuid,
+                    priority=commands.BACKFILL,
+                    idempotency_key=redaction_key(resume.uuid),
+                )
+            )
 
 
-def queue_redaction(evt: events.ResumeCreated, publish: Callable):
-    payload = {"event": "RedactResume", "uuid": evt.uuid}
-    publish("resume.redact_resume", {"uuid": evt.uuid}, wait_for_result=False)
+def prune_processed_messages(
+    cmd: commands.PruneProcessedMessages, uow: unit_of_work.AbstractUnitOfWork
+):
+    with uow:
+        pruned = uow.processed_messages.prune(cmd.older_than_seconds)
+        uow.commit()
+    logger.info("pruned %d processed message keys", pruned)
 
 
-def queue_text_coordinating(evt: events.ResumeCreated, publish: Callable):
-    publish("resume.attach_text_coordinates", {"uuid": evt.uuid}, wait_for_result=False)
+def _already_redacted(resume: model.Resume) -> bool:
+    return (
+        resume.redaction_version == CURRENT_REDACTION_VERSION
+        and resume.redacted_link is not None
+        and not resume.redaction_failed
+    )
 
 
 def redact_resume(
     cmd: commands.RedactResume,
     uow: unit_of_work.AbstractUnitOfWork,
     file_store: AbstractFileStore,
+    scheduler: RedactionScheduler,
 ):
+    # checked before waiting for a slot, a redelivery shouldn't hold one
     with uow:
-        resume = uow.resumes.get_by_uuid(cmd.uuid)
+        resume = uow.resumes.get_by_uuid(
+            cmd.uuid,
+            fields=["uuid", "redaction_version", "redacted_link", "redaction_failed"],
+        )
+        if _already_redacted(resume):
+            logger.info("%s already redacted", resume.uuid)
+            return
+    with scheduler.slot(cmd.priority), uow:
+        resume = uow.resumes.get_by_uuid(
+            cmd.uuid,
+            fields=["uuid", "link", "redaction_version", "skip_redaction"],
+        )
         try:
             dirty_bytes = file_store.read(resume.link)
-            redacted_bytes = model.redact_pdf(
+            supervisor.check_pdf_limits(dirty_bytes)
+            parallelism = get_redaction_parallelism_config()
+            result = supervisor.run_stage(
+                "redaction",
+                model.redact_pdf,
                 bytes=dirty_bytes,
                 redaction_strategies=[
                     redaction.Top30Percent(),
@@ -99,14 +248,36 @@ def redact_resume(
                     redaction.ImageRedactor(),
                     redaction.LinkRedactor(),
                     redaction.MetadataRedactor(),
+                    redaction.OutputOptimizer(),
                 ],
+                return_result=True,
+                parallel=parallelism["enabled"],
+                workers=parallelism["workers"],
+                min_pages_per_shard=parallelism["min_pages_per_shard"],
+            )
+            logger.info(
+                "redacted %s: %d bytes, %d saved by optimization, "
+                "%d pages and %d saves skipped",
+                resume.uuid,
+                len(result.bytes),
+                result.bytes_saved,
+                result.pages_skipped,
+                result.saves_skipped,
             )
-            redacted_text = model.parse_resume_text(redacted_bytes)
-            redacted_link = file_store.write(f"{str(uuid4())}.pdf", redacted_bytes)
-            resume.redacted_text = redacted_text
+            redacted_link = file_store.write(f"{str(uuid4())}.pdf", result.bytes)
+            resume.redacted_text = result.text
             resume.redacted_link = redacted_link
-            resume.events.append(events.ResumeRedacted(uuid=resume.uuid))
+            resume.redaction_failed = False
+            resume.events.append(
+                events.ResumeRedacted(
+                    uuid=resume.uuid,
+                    redacted_rects=(
+                        result.redacted_rects[0] if result.redacted_rects else []
+                    ),
+                )
+            )
         except Exception:
+            resume.redaction_failed = True
             raise
         finally:
             resume.redaction_version = CURRENT_REDACTION_VERSION
@@ -116,12 +287,22 @@ def redact_resume(
 
 
 EVENT_HANDLERS = {
-    events.ResumeCreated: [queue_redaction, queue_text_coordinating],
-    events.ResumeRedacted: [attach_redacted_text_coordinates],
+    events.ResumeCreated: [],
+    events.ResumeRedacted: [
+        invalidate_resume_cache,
+        attach_redacted_text_coordinates,
+        render_redacted_previews,
+    ],
 }
 COMMAND_HANDLERS = {
     commands.CreateResume: create_resume,
     commands.AttachTextCoordinates: attach_text_coordinates,
     commands.RedactResume: redact_resume,
     commands.KickoffResumeRedaction: kickoff_resume_redaction,
+    commands.PruneProcessedMessages: prune_processed_messages,
+}
+# commands create_resume publishes through the outbox, by topic
+TOPIC_COMMANDS = {
+    "resume.redact_resume": commands.RedactResume,
+    "resume.attach_text_coordinates": commands.AttachTextCoordinates,
 }
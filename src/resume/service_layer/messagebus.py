@@ -3,6 +3,7 @@ from typing import Callable, Dict, List, Union, Type
 from resume.domain import commands, events
 
 from . import unit_of_work
+from .profiling import HandlerProfiler
 
 logger = logging.getLogger(__name__)
 Message = Union[commands.Command, events.Event]
@@ -14,10 +15,15 @@ class MessageBus:
         uow: unit_of_work.AbstractUnitOfWork,
         event_handlers: Dict[Type[events.Event], List[Callable]],
         command_handlers: Dict[Type[commands.Command], Callable],
+        profiler: HandlerProfiler | None = None,
+        raise_errors: bool = False,
     ):
         self.uow = uow
         self.event_handlers = event_handlers
         self.command_handlers = command_handlers
+        self.profiler = profiler
+        # consumers re-raise a failed command, so its message isn't acked
+        self.raise_errors = raise_errors
 
     def handle(self, message: Message):
         self.queue = [message]
@@ -34,7 +40,7 @@ class MessageBus:
         for handler in self.event_handlers[type(event)]:
             try:
                 logger.info("handling event %s with handler %s", event, handler)
-                handler(event)
+                self._call(handler, event)
                 self.queue.extend(self.uow.collect_new_events())
             except Exception:
                 logger.exception("Exception handling event %s", event)
@@ -42,9 +48,33 @@ class MessageBus:
 
     def handle_command(self, command: commands.Command):
         logger.info("handling command %s", command)
+        key = command.idempotency_key
         try:
+            if key is not None and self._processed(key):
+                logger.info("skipping already processed command %s", command)
+                return
             handler = self.command_handlers[type(command)]
-            handler(command)
+            self._call(handler, command)
             self.queue.extend(self.uow.collect_new_events())
+            if key is not None:
+                # only once handled, a failed command is retried on redelivery
+                self._mark_processed(key)
         except Exception:
             logger.exception("Exception handling command %s", command)
+            if self.raise_errors:
+                raise
+
+    def _processed(self, key: str) -> bool:
+        with self.uow:
+            return self.uow.processed_messages.contains(key)
+
+    def _mark_processed(self, key: str):
+        with self.uow:
+            self.uow.processed_messages.add(key)
+            self.uow.commit()
+
+    def _call(self, handler: Callable, message: Message):
+        if self.profiler is None:
+            return handler(message)
+        handler_name = getattr(handler, "_original_name", handler.__name__)
+        return self.profiler.run(handler_name, message, lambda: handler(message))
@@ -0,0 +1,64 @@
+import logging
+import time
+
+from resume.adapters.broker import AbstractBroker
+from resume.service_layer import unit_of_work
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """Publishes outbox rows in batches and marks them published.
+
+    Rows are only marked once the broker confirmed the whole batch, so a
+    failure leaves them to be retried (at-least-once delivery).
+    """
+
+    def __init__(
+        self,
+        uow: unit_of_work.AbstractUnitOfWork,
+        broker: AbstractBroker,
+        batch_size: int = 100,
+    ):
+        self.uow = uow
+        self.broker = broker
+        self.batch_size = batch_size
+
+    def relay_once(self) -> int:
+        with self.uow:
+            rows = self.uow.outbox.list_unpublished(self.batch_size)
+            if not rows:
+                return 0
+            self.broker.publish_batch([(row["topic"], row["payload"]) for row in rows])
+            self.uow.outbox.mark_published([row["id"] for row in rows])
+            self.uow.commit()
+        logger.info("relayed %d outbox messages", len(rows))
+        return len(rows)
+
+    def relay_pending(self) -> int:
+        relayed = 0
+        while True:
+            count = self.relay_once()
+            relayed += count
+            if count < self.batch_size:
+                return relayed
+
+    def run(self, poll_interval: float = 1.0, listener=None):
+        """Relays until killed, woken by ``listener`` as soon as rows are
+        committed, or else every ``poll_interval`` seconds."""
+        if listener is not None:
+            # listening before the first relay, so no commit goes unnoticed
+            listener.listen()
+        while True:
+            try:
+                self.relay_pending()
+            except Exception:
+                logger.exception("Exception relaying outbox")
+            if listener is None:
+                time.sleep(poll_interval)
+                continue
+            try:
+                listener.wait(poll_interval)
+            except Exception:
+                logger.exception("Exception waiting for outbox notifications")
+                time.sleep(poll_interval)
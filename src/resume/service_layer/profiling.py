@@ -0,0 +1,147 @@
+"""Opt-in cProfile capture of message handlers, and a CLI to aggregate them.
+
+    python -m resume.service_layer.profiling DIR [--top N] [--sort cumulative]
+"""
+import argparse
+import cProfile
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+
+from resume.config import get_profiling_config
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = "__"
+
+_local = threading.local()
+
+
+def stage_profiles() -> list | None:
+    """Where supervised stages add the stats of their child process, or None
+    when the running handler isn't profiled."""
+    return getattr(_local, "stage_profiles", None)
+
+
+class _StageStats:
+    # what pstats.Stats.add expects of a profile
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class HandlerProfiler:
+    """Profiles a ``sample_rate`` fraction of handler calls, and writes the
+    ones of a ``threshold_sample_rate`` fraction that are slower than
+    ``threshold_seconds``.
+
+    A profile can't be started after the fact, so slow calls are only caught
+    among the sampled ones. Supervised stages profile their child process
+    and the stats are merged into the handler's profile.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 0.0,
+        threshold_seconds: float | None = None,
+        threshold_sample_rate: float = 0.1,
+        random=random.random,
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.threshold_seconds = threshold_seconds
+        self.threshold_sample_rate = threshold_sample_rate
+        self.random = random
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: dict | None = None):
+        config = config or get_profiling_config()
+        if not config["directory"]:
+            return None
+        return cls(**config)
+
+    def run(self, handler_name: str, message, call):
+        sampled = self.random() < self.sample_rate
+        watched = (
+            not sampled
+            and self.threshold_seconds is not None
+            and self.random() < self.threshold_sample_rate
+        )
+        # nested handler calls are covered by the outer profile
+        if not (sampled or watched) or stage_profiles() is not None:
+            return call()
+
+        profile = cProfile.Profile()
+        _local.stage_profiles = []
+        started_at = time.perf_counter()
+        try:
+            return profile.runcall(call)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            children, _local.stage_profiles = _local.stage_profiles, None
+            if sampled or elapsed >= self.threshold_seconds:
+                self._dump(profile, children, handler_name, message, elapsed)
+
+    def _dump(self, profile, children, handler_name, message, elapsed):
+        name = SEPARATOR.join(
+            [
+                _safe(handler_name),
+                type(message).__name__,
+                _safe(str(getattr(message, "uuid", "none"))),
+                f"{time.time_ns()}",
+            ]
+        )
+        path = os.path.join(self.directory, f"{name}.prof")
+        try:
+            stats = pstats.Stats(profile)
+            for child in children:
+                stats.add(_StageStats(child))
+            stats.dump_stats(path)
+        except OSError:
+            logger.exception("Could not write profile %s", path)
+            return
+        logger.info("profiled %s for %s in %.3fs: %s", handler_name, message, elapsed, path)
+
+
+def _safe(value: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", value).replace(SEPARATOR, "_")
+
+
+def aggregate(directory: str):
+    by_handler = defaultdict(list)
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".prof"):
+            handler_name = filename.split(SEPARATOR)[0]
+            by_handler[handler_name].append(os.path.join(directory, filename))
+    return {
+        handler_name: (len(paths), pstats.Stats(*paths))
+        for handler_name, paths in by_handler.items()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate handler profiles.")
+    parser.add_argument("directory")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--sort", default="cumulative")
+    parser.add_argument("--handler", help="only this handler")
+    args = parser.parse_args(argv)
+
+    for handler_name, (count, stats) in aggregate(args.directory).items():
+        if args.handler and handler_name != args.handler:
+            continue
+        print(f"=== {handler_name} ({count} profiles)")
+        stats.sort_stats(args.sort).print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from resume.adapters.admission import (
+    AbstractAdmission,
+    InMemoryAdmission,
+    PostgresAdmission,
+)
+from resume.config import get_redaction_scheduler_config
+from resume.domain import commands
+from resume.service_layer import unit_of_work
+
+
+class RedactionScheduler:
+    """Admits redaction work by priority class.
+
+    Slots and the backfill rate are counted by ``admission``, in this process
+    or across every worker. Within the process, backfill never overtakes
+    waiting interactive work.
+    """
+
+    def __init__(
+        self, admission: AbstractAdmission | None = None, clock=time.monotonic
+    ):
+        self.admission = admission or InMemoryAdmission()
+        self.clock = clock
+        self._condition = threading.Condition()
+        self._stats = {
+            priority: dict(waiting=0, running=0, admitted=0, wait_seconds=0.0)
+            for priority in commands.PRIORITIES
+        }
+
+    @classmethod
+    def from_config(cls, config: dict | None = None):
+        config = config or get_redaction_scheduler_config()
+        limits = dict(
+            capacity=config["capacity"],
+            reserved_interactive=config["reserved_interactive"],
+            backfill_per_minute=config["backfill_per_minute"],
+        )
+        if config["shared"]:
+            admission = PostgresAdmission(
+                unit_of_work.get_engine,
+                poll_interval=config["poll_interval"],
+                **limits,
+            )
+        else:
+            admission = InMemoryAdmission(**limits)
+        return cls(admission)
+
+    def _may_try(self, priority: str) -> bool:
+        return (
+            priority == commands.INTERACTIVE
+            or self._stats[commands.INTERACTIVE]["waiting"] == 0
+        )
+
+    def backfill_ready(self) -> bool:
+        # lets kickoff avoid claiming a resume it couldn't start now
+        with self._condition:
+            return self._may_try(commands.BACKFILL) and self.admission.ready(
+                commands.BACKFILL
+            )
+
+    @contextmanager
+    def slot(self, priority: str = commands.INTERACTIVE):
+        stats = self._stats[priority]
+        with self._condition:
+            stats["waiting"] += 1
+            enqueued_at = self.clock()
+            try:
+                while True:
+                    lease = None
+                    if self._may_try(priority):
+                        lease = self.admission.acquire(priority)
+                    if lease is not None:
+                        break
+                    # without a timeout only a release here wakes it up
+                    self._condition.wait(self.admission.retry_in(priority))
+            finally:
+                stats["waiting"] -= 1
+            stats["running"] += 1
+            stats["admitted"] += 1
+            stats["wait_seconds"] += self.clock() - enqueued_at
+            # backfill held back by this waiting work may go now
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                stats["running"] -= 1
+                try:
+                    self.admission.release(lease)
+                finally:
+                    self._condition.notify_all()
+
+    def admitted(self, priority: str) -> int:
+        with self._condition:
+            return self._stats[priority]["admitted"]
+
+    def metrics(self) -> dict:
+        with self._condition:
+            metrics = {
+                priority: dict(
+                    queue_depth=stats["waiting"],
+                    running=stats["running"],
+                    admitted=stats["admitted"],
+                    mean_wait_seconds=(
+                        stats["wait_seconds"] / stats["admitted"]
+                        if stats["admitted"]
+                        else 0.0
+                    ),
+                )
+                for priority, stats in self._stats.items()
+            }
+            metrics["slots"] = self.admission.metrics()
+            return metrics
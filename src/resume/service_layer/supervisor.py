@@ -0,0 +1,134 @@
+import cProfile
+import logging
+import multiprocessing
+import os
+import resource
+import signal
+
+from resume.config import get_pdf_limits_config
+from resume.domain import model
+from resume.service_layer import profiling
+
+logger = logging.getLogger(__name__)
+
+# stages are forked off a fork server, a fresh single threaded process, never
+# off the caller: the web app and the workers run threads (pools, executors)
+# whose locks a forked child could inherit held. The server imports the PDF
+# libraries once, so the stages start warm.
+_context = multiprocessing.get_context("forkserver")
+_context.set_forkserver_preload(
+    ["resume.domain.model", "resume.domain.redaction", "fitz", "pdfminer.high_level"]
+)
+
+
+class DeadlineExceeded(model.ResourceLimitExceeded):
+    pass
+
+
+class MemoryLimitExceeded(model.ResourceLimitExceeded):
+    pass
+
+
+def check_pdf_limits(bytes: bytes, limits: dict | None = None):
+    # only reads the trailer and page tree, cheap enough not to supervise;
+    # the text is counted in the parse stage
+    limits = limits or get_pdf_limits_config()
+    model.check_pdf_limits(
+        bytes,
+        max_bytes=limits["max_bytes"],
+        max_pages=limits["max_pages"],
+        max_objects=limits["max_objects"],
+    )
+
+
+def run_stage(stage: str, func, *args, limits: dict | None = None, **kwargs):
+    """Runs ``func`` in a child bounded by the stage's deadline and the memory
+    cap, killing it on breach.
+
+    ``func`` and its arguments are pickled to the child, exceptions raised by
+    ``func`` are re-raised in the caller.
+    """
+    limits = limits or get_pdf_limits_config()
+    if not limits["supervise"]:
+        return func(*args, **kwargs)
+
+    deadline = limits["deadlines"].get(stage, limits["default_deadline"])
+    # the work happens in the child, so that is where a profiled handler's
+    # stage is profiled
+    stage_profiles = profiling.stage_profiles()
+    parent_conn, child_conn = _context.Pipe(duplex=False)
+    process = _context.Process(
+        target=_run_child,
+        args=(
+            child_conn,
+            limits["max_memory_bytes"],
+            stage_profiles is not None,
+            func,
+            args,
+            kwargs,
+        ),
+        name=f"resume-{stage}",
+    )
+    process.start()
+    child_conn.close()
+    try:
+        if not parent_conn.poll(deadline):
+            logger.warning("killing %s stage after %ss", stage, deadline)
+            raise DeadlineExceeded(f"{stage} exceeded its {deadline}s deadline")
+        try:
+            status, value, stats = parent_conn.recv()
+        except EOFError:
+            process.join()
+            raise model.ResourceLimitExceeded(
+                f"{stage} worker died with exit code {process.exitcode}"
+            )
+    finally:
+        _kill_process_group(process)
+        process.join()
+        parent_conn.close()
+
+    if stats is not None and stage_profiles is not None:
+        stage_profiles.append(stats)
+    if status == "error":
+        raise value
+    return value
+
+
+def _kill_process_group(process):
+    # the child leads its own group, so processes it forked (redaction shard
+    # workers) are killed with it instead of outliving the deadline
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    if process.is_alive():
+        process.kill()
+
+
+def _run_child(conn, max_memory_bytes, profile, func, args, kwargs):
+    os.setpgid(0, 0)
+    # the cap is on top of the address space inherited from the parent, and
+    # is shared by any processes the stage forks
+    limit = model.address_space_bytes() + max_memory_bytes
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    profiler = cProfile.Profile() if profile else None
+    try:
+        if profiler is not None:
+            message = ("ok", profiler.runcall(func, *args, **kwargs))
+        else:
+            message = ("ok", func(*args, **kwargs))
+    except MemoryError:
+        message = ("error", MemoryLimitExceeded(f"exceeded {max_memory_bytes} bytes"))
+    except Exception as e:
+        message = ("error", e)
+    stats = None
+    if profiler is not None:
+        profiler.create_stats()
+        stats = profiler.stats
+    try:
+        conn.send((*message, stats))
+    except Exception as e:
+        # unpicklable results or exceptions
+        conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}"), None))
+    conn.close()
+
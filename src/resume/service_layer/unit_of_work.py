@@ -1,6 +1,8 @@
 # pylint: disable=attribute-defined-outside-init
 from __future__ import annotations
 import abc
+import os
+import threading
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.session import Session
@@ -10,12 +12,15 @@ from common import config
 from common.adapters import readonly_repository as ro_repo
 
 from resume.adapters import repository
+from resume.config import get_postgres_pool_config
 from resume.domain import model
 
 
 class AbstractUnitOfWork(abc.ABC):
     resumes: repository.AbstractRepository
     prospects: ro_repo.AbstractReadOnlyRepository
+    outbox: repository.AbstractOutboxRepository
+    processed_messages: repository.AbstractProcessedMessageRepository
 
     def __enter__(self) -> AbstractUnitOfWork:
         return self
@@ -40,10 +45,63 @@ class AbstractUnitOfWork(abc.ABC):
         raise NotImplementedError
 
 
-DEFAULT_SESSION_FACTORY = sessionmaker(
-    bind=create_engine(
-        config.get_postgres_uri(), isolation_level="REPEATABLE READ", max_overflow=20
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    # created on first use in each process, so workers forked after import
+    # never share pooled sockets with their parent
+    global _engine, _engine_pid
+    pid = os.getpid()
+    if _engine_pid != pid:
+        with _engine_lock:
+            if _engine_pid != pid:
+                if _engine is not None:
+                    # drop the parent's pool without closing its connections
+                    _engine.dispose(close=False)
+                _engine = create_engine(
+                    config.get_postgres_uri(),
+                    isolation_level="REPEATABLE READ",
+                    **get_postgres_pool_config(),
+                )
+                _engine_pid = pid
+    return _engine
+
+
+def pool_status() -> dict:
+    if _engine is None or _engine_pid != os.getpid():
+        return dict(size=0, checked_in=0, checked_out=0, overflow=0)
+    pool = _engine.pool
+    return dict(
+        size=pool.size(),
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        overflow=pool.overflow(),
     )
+
+
+class LazySessionFactory:
+    def __init__(self, **execution_options):
+        self.execution_options = execution_options
+        self._sessionmaker = None
+        self._engine = None
+
+    def __call__(self) -> Session:
+        engine = get_engine()
+        if self._engine is not engine:
+            bind = engine
+            if self.execution_options:
+                bind = engine.execution_options(**self.execution_options)
+            self._sessionmaker = sessionmaker(bind=bind)
+            self._engine = engine
+        return self._sessionmaker()
+
+
+DEFAULT_SESSION_FACTORY = LazySessionFactory()
+READ_ONLY_SESSION_FACTORY = LazySessionFactory(
+    isolation_level="READ COMMITTED", postgresql_readonly=True
 )
 
 
@@ -57,6 +115,10 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
         self.prospects = ro_repo.SqlAlchemyReadOnlyRepository(
             self.session, model.Prospect
         )
+        self.outbox = repository.SqlAlchemyOutboxRepository(self.session)
+        self.processed_messages = repository.SqlAlchemyProcessedMessageRepository(
+            self.session
+        )
         return super().__enter__()
 
     def __exit__(self, *args):
@@ -68,3 +130,40 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
 
     def rollback(self):
         self.session.rollback()
+
+
+class InMemoryProspectRepository:
+    def __init__(self, prospects=()):
+        self.prospects = {prospect.uuid: prospect for prospect in prospects}
+
+    def add(self, prospect: model.Prospect):
+        self.prospects[prospect.uuid] = prospect
+
+    def get_by_uuid(self, uuid):
+        return self.prospects.get(uuid)
+
+
+class InMemoryUnitOfWork(AbstractUnitOfWork):
+    """Shares one set of in-memory repositories between every ``with uow``.
+
+    Nothing is undone on rollback; ``committed`` counts commits.
+    """
+
+    def __init__(self, prospects=()):
+        self.resumes = repository.InMemoryRepository()
+        self.prospects = InMemoryProspectRepository(prospects)
+        self.outbox = repository.InMemoryOutboxRepository()
+        self.processed_messages = repository.InMemoryProcessedMessageRepository()
+        self.committed = 0
+
+    def __enter__(self):
+        # like a new session, only what this block touches has its events
+        # collected
+        self.resumes.seen = set()
+        return super().__enter__()
+
+    def _commit(self):
+        self.committed += 1
+
+    def rollback(self):
+        pass
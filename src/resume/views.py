@@ -1,7 +1,23 @@
 from typing import List, Literal
+import base64
+import hashlib
+import json
 import re
 
 
+def _safe_keywords(keywords: str) -> str:
+    safe_keywords = re.sub(r"(\s+)", "|", keywords)
+    safe_keywords = re.sub(r"([^\|\w]+)", "", safe_keywords)
+    return safe_keywords
+
+
+def normalize_keywords(keywords: str | None) -> str:
+    if keywords is None:
+        return ""
+    words = {word.lower() for word in _safe_keywords(keywords).split("|") if word}
+    return "|".join(sorted(words))
+
+
 def get_resume(uow, uuid, keywords: str | None = None):
     with uow:
         query = uow.session.execute(
@@ -11,7 +27,8 @@ def get_resume(uow, uuid, keywords: str | None = None):
             "resume".uuid as "uuid", 
             "resume".link as "link",
             "resume".width as "width", 
-            "resume".height as "height"
+            "resume".height as "height",
+            "resume".preview_pages -> 0 as "preview_page"
             FROM "resume"
             WHERE "resume".uuid = :uuid
             """,
@@ -23,8 +40,7 @@ def get_resume(uow, uuid, keywords: str | None = None):
         resume = dict(result)
 
         if keywords is not None:
-            safe_keywords = re.sub(r"(\s+)", "|", keywords)
-            safe_keywords = re.sub(r"([^\|\w]+)", "", safe_keywords)
+            safe_keywords = _safe_keywords(keywords)
 
             tc_query = uow.session.execute(
                 """
@@ -46,3 +62,266 @@ def get_resume(uow, uuid, keywords: str | None = None):
             resume["text_coordinates"] = []
 
         return resume
+
+
+def get_preview_link(uow, uuid, page: int, width: int) -> str | None:
+    with uow:
+        query = uow.session.execute(
+            """
+            SELECT "resume".preview_links -> :width ->> :page as "link"
+            FROM "resume"
+            WHERE "resume".uuid = :uuid
+            """,
+            dict(uuid=uuid, width=str(width), page=page),
+        )
+        return query.scalar()
+
+
+def scale_text_coordinates(resume: dict, preview_width: int) -> dict:
+    """Moves a resume payload into the pixel space of its ``preview_width`` preview.
+
+    Coordinates are pdfminer's, in PDF points with a bottom-left origin. The
+    ``preview_page`` saved with the previews maps them onto the page that was
+    rendered, its crop box turned by its rotation, with a top-left origin.
+    Before the previews are rendered the media box is assumed, y flipped.
+    """
+    page = resume.get("preview_page")
+    if page is None:
+        if not resume["width"]:
+            return resume
+        page = dict(
+            width=resume["width"],
+            height=resume["height"],
+            matrix=[1, 0, 0, -1, 0, resume["height"]],
+        )
+    a, b, c, d, e, f = page["matrix"]
+    scale = preview_width / page["width"]
+
+    def scaled(tc):
+        # the box covering the mapped corners, whichever axes the matrix flips
+        corners = [
+            (x, y) for x in (tc["x0"], tc["x1"]) for y in (tc["y0"], tc["y1"])
+        ]
+        xs = [(x * a + y * c + e) * scale for x, y in corners]
+        ys = [(x * b + y * d + f) * scale for x, y in corners]
+        return dict(tc, x0=min(xs), x1=max(xs), y0=min(ys), y1=max(ys))
+
+    return dict(
+        resume,
+        width=preview_width,
+        height=round(page["height"] * scale),
+        text_coordinates=[scaled(tc) for tc in resume["text_coordinates"]],
+    )
+
+
+def resume_cache_field(keywords: str | None = None) -> str:
+    # keywords=None (no highlights) and keywords="" (no matches) differ
+    if keywords is None:
+        return "-"
+    return f"k:{normalize_keywords(keywords)}"
+
+
+def get_cached_resume(uow, cache, uuid, keywords: str | None = None):
+    """Returns ``{"etag": ..., "data": ...}`` or None when the resume is missing.
+
+    A hit is served from the cache alone, without touching the database;
+    the handlers writing anything get_resume reads invalidate the resume.
+    """
+
+    def load():
+        resume = get_resume(uow, uuid, keywords=keywords)
+        if resume is None:
+            return None
+        payload = json.dumps(resume, sort_keys=True, default=str).encode()
+        return dict(etag=hashlib.sha1(payload).hexdigest(), data=resume)
+
+    return cache.get_or_load(uuid, resume_cache_field(keywords), load)
+
+
+def resume_etag(cached: dict, preview_width: int | None = None, compact=False):
+    # one representation per preview width and format of the cached response
+    etag = cached["etag"]
+    if preview_width is not None:
+        etag = f"{etag}-w{preview_width}"
+    if compact:
+        etag = f"{etag}-c"
+    return etag
+
+
+def get_resumes(uow, uuids: List[str], keywords: str | None = None):
+    # one round-trip for the whole page of results, in the order requested
+    with uow:
+        if keywords is not None:
+            query = uow.session.execute(
+                """
+                SELECT
+                "resume".uuid as "uuid",
+                "resume".link as "link",
+                "resume".width as "width",
+                "resume".height as "height",
+                "text_coordinates".text as "text",
+                "text_coordinates".x0 as "x0",
+                "text_coordinates".x1 as "x1",
+                "text_coordinates".y0 as "y0",
+                "text_coordinates".y1 as "y1"
+                FROM "resume"
+                LEFT JOIN "text_coordinates"
+                ON "text_coordinates".resume_id = "resume".id
+                AND "text_coordinates".tsv @@ to_tsquery('english', :keywords)
+                WHERE "resume".uuid = ANY(:uuids)
+                """,
+                dict(uuids=list(uuids), keywords=_safe_keywords(keywords)),
+            )
+        else:
+            query = uow.session.execute(
+                """
+                SELECT
+                "resume".uuid as "uuid",
+                "resume".link as "link",
+                "resume".width as "width",
+                "resume".height as "height"
+                FROM "resume"
+                WHERE "resume".uuid = ANY(:uuids)
+                """,
+                dict(uuids=list(uuids)),
+            )
+
+        resumes = {}
+        for row in query.all():
+            row = dict(row)
+            resume = resumes.get(row["uuid"])
+            if resume is None:
+                resume = dict(
+                    uuid=row["uuid"],
+                    link=row["link"],
+                    width=row["width"],
+                    height=row["height"],
+                    text_coordinates=[],
+                )
+                resumes[row["uuid"]] = resume
+            if row.get("text") is not None:
+                resume["text_coordinates"].append(
+                    dict(
+                        text=row["text"],
+                        x0=row["x0"],
+                        x1=row["x1"],
+                        y0=row["y0"],
+                        y1=row["y1"],
+                    )
+                )
+        return [resumes[uuid] for uuid in uuids if uuid in resumes]
+
+
+def encode_search_cursor(rank: float, id: int) -> str:
+    raw = json.dumps([rank, id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_search_cursor(cursor: str):
+    try:
+        rank, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(id)
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid search cursor {cursor!r}")
+
+
+def search_resumes(
+    uow,
+    keywords: str,
+    show_redacted: bool = False,
+    limit: int = 20,
+    cursor: str | None = None,
+    max_candidates: int = 1000,
+):
+    """Pages through the resumes matching ``keywords``, best ranked first.
+
+    Only the ``max_candidates`` newest matches are ranked, so a common keyword
+    costs the same as a rare one; older matches beyond that are not found.
+    Pages follow a (rank, id) keyset, deep pages cost the same as the first.
+    """
+    # the candidates come off the GIN index (ix_resume_tsv/ix_resume_redacted_tsv)
+    # before any ts_rank_cd, which reads the whole tsvector of every row it ranks
+    tsv_column = "redacted_tsv" if show_redacted else "tsv"
+    keyset = ""
+    params = dict(
+        keywords=_safe_keywords(keywords), limit=limit, max_candidates=max_candidates
+    )
+    if cursor is not None:
+        keyset = 'AND ("matches".rank, "matches".id) < (:cursor_rank, :cursor_id)'
+        params["cursor_rank"], params["cursor_id"] = decode_search_cursor(cursor)
+    show_redacted_filter = 'AND "resume".show_redacted' if show_redacted else ""
+
+    with uow:
+        query = uow.session.execute(
+            f"""
+            WITH "candidates" AS (
+                SELECT
+                "resume".id as "id",
+                "resume".uuid as "uuid",
+                "resume".link as "link",
+                "resume".width as "width",
+                "resume".height as "height",
+                "resume".{tsv_column} as "tsv"
+                FROM "resume"
+                WHERE "resume".{tsv_column} @@ to_tsquery('english', :keywords)
+                {show_redacted_filter}
+                ORDER BY "resume".id DESC
+                LIMIT :max_candidates
+            ), "matches" AS (
+                SELECT
+                "candidates".id as "id",
+                "candidates".uuid as "uuid",
+                "candidates".link as "link",
+                "candidates".width as "width",
+                "candidates".height as "height",
+                ts_rank_cd(
+                    "candidates".tsv, to_tsquery('english', :keywords)
+                )::float8 as "rank"
+                FROM "candidates"
+            )
+            SELECT * FROM "matches"
+            WHERE TRUE {keyset}
+            ORDER BY "matches".rank DESC, "matches".id DESC
+            LIMIT :limit
+            """,
+            params,
+        )
+        rows = [dict(row) for row in query.all()]
+        if not rows:
+            return dict(data=[], next_cursor=None)
+
+        tc_query = uow.session.execute(
+            """
+            SELECT
+            "text_coordinates".resume_id as "resume_id",
+            "text_coordinates".text as "text",
+            "text_coordinates".x0 as "x0",
+            "text_coordinates".x1 as "x1",
+            "text_coordinates".y0 as "y0",
+            "text_coordinates".y1 as "y1"
+            FROM "text_coordinates"
+            WHERE "text_coordinates".resume_id = ANY(:resume_ids)
+            AND coalesce("text_coordinates".redacted, false) = :redacted
+            AND "text_coordinates".tsv @@ to_tsquery('english', :keywords)
+            """,
+            dict(
+                resume_ids=[row["id"] for row in rows],
+                redacted=show_redacted,
+                keywords=params["keywords"],
+            ),
+        )
+        text_coordinates = {}
+        for tc in tc_query.all():
+            tc = dict(tc)
+            text_coordinates.setdefault(tc.pop("resume_id"), []).append(tc)
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_search_cursor(rows[-1]["rank"], rows[-1]["id"])
+    resumes = []
+    for row in rows:
+        resume_id = row.pop("id")
+        row.pop("rank")
+        row["text_coordinates"] = text_coordinates.get(resume_id, [])
+        resumes.append(row)
+    return dict(data=resumes, next_cursor=next_cursor)
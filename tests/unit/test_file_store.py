@@ -0,0 +1,66 @@
+import io
+
+import pytest
+
+from resume.adapters.file_store import CachedFileStore, S3FileStore
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Bucket, Key] = Body
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Bucket, Key])}
+
+
+def test_s3_links_round_trip():
+    store = S3FileStore(
+        "resumes", prefix="uploads/", aws_region="eu-west-1", client=FakeS3Client()
+    )
+
+    link = store.write("some uuid.pdf", b"%PDF")
+
+    assert link == "https://resumes.s3.eu-west-1.amazonaws.com/uploads/some%20uuid.pdf"
+    assert store.read(link) == b"%PDF"
+    assert store.client.objects == {("resumes", "uploads/some uuid.pdf"): b"%PDF"}
+
+
+def test_s3_links_without_a_region():
+    store = S3FileStore("resumes", client=FakeS3Client())
+
+    link = store.write("some-uuid.pdf", b"%PDF")
+
+    assert link == "https://resumes.s3.amazonaws.com/some-uuid.pdf"
+    assert store.read(link) == b"%PDF"
+
+
+@pytest.mark.parametrize(
+    "link",
+    [
+        "uploads/some-uuid.pdf",
+        "s3://resumes/uploads/some-uuid.pdf",
+        "https://resumes.s3.amazonaws.com/uploads/some-uuid.pdf",
+        "https://resumes.s3.eu-west-1.amazonaws.com/uploads/some-uuid.pdf",
+        "https://s3.eu-west-1.amazonaws.com/resumes/uploads/some-uuid.pdf",
+    ],
+)
+def test_s3_reads_links_of_existing_resumes(link):
+    client = FakeS3Client()
+    client.put_object(Bucket="resumes", Key="uploads/some-uuid.pdf", Body=b"%PDF")
+    store = S3FileStore("resumes", prefix="uploads", client=client)
+
+    assert store.read(link) == b"%PDF"
+
+
+def test_cached_store_keeps_the_backend_links():
+    client = FakeS3Client()
+    store = CachedFileStore(S3FileStore("resumes", prefix="uploads", client=client))
+
+    link = store.write("some-uuid.pdf", b"%PDF")
+    client.objects.clear()
+
+    assert link == "https://resumes.s3.amazonaws.com/uploads/some-uuid.pdf"
+    assert store.read(link) == b"%PDF"
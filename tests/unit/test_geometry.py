@@ -0,0 +1,57 @@
+from resume.domain.geometry import RectGrid, filter_redacted_text_coordinates
+from resume.domain.model import TextCoordinates
+
+
+def word(text, x0, y0, x1, y1):
+    return TextCoordinates(
+        resume_id=1, redacted=False, text=text, x0=x0, x1=x1, y0=y0, y1=y1, id=7
+    )
+
+
+def test_covered_fraction_without_overlap():
+    grid = RectGrid([(0, 0, 10, 10)])
+
+    assert grid.covered_fraction((20, 20, 30, 30)) == 0.0
+
+
+def test_covered_fraction_of_a_partly_covered_box():
+    grid = RectGrid([(0, 0, 10, 10)])
+
+    assert grid.covered_fraction((5, 0, 15, 10)) == 0.5
+
+
+def test_covered_fraction_counts_a_rect_spanning_cells_once():
+    grid = RectGrid([(0, 0, 200, 200)], cell_size=50)
+
+    assert grid.covered_fraction((40, 40, 160, 160)) == 1.0
+
+
+def test_covered_fraction_normalizes_flipped_rects():
+    grid = RectGrid([(10, 10, 0, 0)])
+
+    assert grid.covered_fraction((10, 10, 5, 0)) == 1.0
+
+
+def test_covered_fraction_of_an_empty_box():
+    grid = RectGrid([(0, 0, 10, 10)])
+
+    assert grid.covered_fraction((5, 5, 5, 8)) == 0.0
+
+
+def test_filter_drops_words_under_redaction_rects():
+    kept = filter_redacted_text_coordinates(
+        [word("python", 0, 0, 40, 10), word("smith", 100, 0, 140, 10)],
+        [(95, -5, 150, 15)],
+        resume_id=2,
+    )
+
+    assert [tc.text for tc in kept] == ["python"]
+    assert (kept[0].id, kept[0].resume_id, kept[0].redacted) == (None, 2, True)
+
+
+def test_filter_drops_words_only_slightly_covered():
+    kept = filter_redacted_text_coordinates(
+        [word("smith", 0, 0, 100, 10)], [(90, 0, 200, 10)]
+    )
+
+    assert kept == []
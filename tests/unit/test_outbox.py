@@ -0,0 +1,220 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+from sqlalchemy.orm import Session
+
+from resume.adapters import repository
+from resume.adapters.broker import (
+    InMemoryBroker,
+    RabbitMQBroker,
+    UnroutableMessages,
+)
+from resume.domain import commands
+from resume.service_layer import messagebus, unit_of_work
+from resume.service_layer.outbox import OutboxRelay
+
+
+def emitted_sql(call) -> list:
+    session = Session()
+    statements = []
+
+    @event.listens_for(session, "do_orm_execute")
+    def capture(orm_execute_state):
+        statements.append(orm_execute_state.statement)
+        return IteratorResult(SimpleResultMetaData([]), iter([]))
+
+    call(repository.SqlAlchemyOutboxRepository(session))
+    return [
+        str(statement.compile(dialect=postgresql.dialect()))
+        for statement in statements
+    ]
+
+
+def test_add_notifies_the_relay_in_the_same_transaction():
+    insert, notify = emitted_sql(lambda outbox: outbox.add("topic", {"uuid": "x"}))
+
+    assert insert.startswith("INSERT INTO outbox")
+    assert "pg_notify" in notify
+
+
+def test_list_unpublished_skips_rows_held_by_another_relay():
+    [sql] = emitted_sql(lambda outbox: outbox.list_unpublished(10))
+
+    assert "outbox.published_at IS NULL" in sql
+    assert "ORDER BY outbox.id" in sql
+    assert "LIMIT" in sql
+    assert sql.endswith("FOR UPDATE SKIP LOCKED")
+
+
+def test_mark_published_sets_published_at():
+    [sql] = emitted_sql(lambda outbox: outbox.mark_published([1, 2]))
+
+    assert sql.startswith("UPDATE outbox SET published_at=now()")
+    assert "outbox.id IN" in sql
+
+
+def outbox_with(count):
+    uow = unit_of_work.InMemoryUnitOfWork()
+    for n in range(count):
+        uow.outbox.add("topic", {"n": n})
+    return uow
+
+
+def test_relay_publishes_pending_rows_in_batches():
+    uow = outbox_with(5)
+    broker = InMemoryBroker()
+
+    assert OutboxRelay(uow, broker, batch_size=2).relay_pending() == 5
+
+    assert broker.published == [("topic", {"n": n}) for n in range(5)]
+    assert uow.outbox.list_unpublished(10) == []
+    assert uow.committed == 3
+
+
+def test_relay_leaves_rows_of_a_failed_batch_to_be_retried():
+    class FailingBroker(InMemoryBroker):
+        def publish_batch(self, messages):
+            raise ConnectionError
+
+    uow = outbox_with(2)
+
+    with pytest.raises(ConnectionError):
+        OutboxRelay(uow, FailingBroker()).relay_once()
+
+    assert len(uow.outbox.list_unpublished(10)) == 2
+    assert uow.committed == 0
+
+
+def test_relay_of_an_empty_outbox_publishes_nothing():
+    broker = InMemoryBroker()
+
+    assert OutboxRelay(outbox_with(0), broker).relay_once() == 0
+    assert broker.published == []
+
+
+def test_in_memory_broker_keeps_messages_in_order():
+    broker = InMemoryBroker()
+
+    broker.publish_batch([("a", {"n": 1})])
+    broker.publish_batch([("b", {"n": 2}), ("a", {"n": 3})])
+
+    assert broker.published == [("a", {"n": 1}), ("b", {"n": 2}), ("a", {"n": 3})]
+
+
+class FakeChannel:
+    is_closed = False
+
+    def __init__(self, unroutable=()):
+        self.unroutable = unroutable
+        self.calls = []
+        self.connection = SimpleNamespace(
+            process_data_events=lambda time_limit: None,
+            close=lambda: self.calls.append("close"),
+        )
+        self.on_return = None
+
+    def basic_publish(self, exchange, routing_key, body, properties, mandatory):
+        self.calls.append(("publish", routing_key))
+        if routing_key in self.unroutable:
+            # returned before the commit's ok
+            self.on_return(self, SimpleNamespace(routing_key=routing_key), None, body)
+
+    def tx_commit(self):
+        self.calls.append("commit")
+
+    def basic_ack(self, delivery_tag):
+        self.calls.append(("ack", delivery_tag))
+
+    def basic_nack(self, delivery_tag, requeue):
+        self.calls.append(("nack", delivery_tag, requeue))
+
+
+def connected_broker(channel):
+    broker = RabbitMQBroker("amqp://", "resume")
+    broker._channel, broker._pid = channel, os.getpid()
+    channel.on_return = broker._on_return
+    return broker
+
+
+def test_publish_batch_commits_once_per_batch():
+    channel = FakeChannel()
+
+    connected_broker(channel).publish_batch([("a", {}), ("b", {}), ("c", {})])
+
+    assert channel.calls == [
+        ("publish", "a"),
+        ("publish", "b"),
+        ("publish", "c"),
+        "commit",
+    ]
+
+
+def test_publish_batch_fails_on_an_unroutable_message():
+    channel = FakeChannel(unroutable={"b"})
+    broker = connected_broker(channel)
+
+    with pytest.raises(UnroutableMessages):
+        broker.publish_batch([("a", {}), ("b", {})])
+
+    assert channel.calls[-1] == "close"
+    assert broker._channel is None
+
+
+def delivery(redelivered=False):
+    return SimpleNamespace(routing_key="topic", delivery_tag=7, redelivered=redelivered)
+
+
+def test_handled_messages_are_acked():
+    channel = FakeChannel()
+
+    def handle(topic, payload):
+        pass
+
+    RabbitMQBroker._on_message(handle, channel, delivery(), None, b"{}")
+
+    assert channel.calls == [("ack", 7)]
+
+
+@pytest.mark.parametrize("redelivered, requeue", [(False, True), (True, False)])
+def test_failed_messages_are_requeued_once_then_dead_lettered(redelivered, requeue):
+    channel = FakeChannel()
+
+    def handle(topic, payload):
+        raise ValueError
+
+    RabbitMQBroker._on_message(handle, channel, delivery(redelivered), None, b"{}")
+
+    assert channel.calls == [("nack", 7, requeue)]
+
+
+def bus_failing_with(exception, raise_errors):
+    def redact_resume(cmd):
+        raise exception
+
+    return messagebus.MessageBus(
+        uow=unit_of_work.InMemoryUnitOfWork(),
+        event_handlers={},
+        command_handlers={commands.RedactResume: redact_resume},
+        raise_errors=raise_errors,
+    )
+
+
+def test_consumer_bus_raises_a_failed_command_and_leaves_it_unprocessed():
+    bus = bus_failing_with(ValueError(), raise_errors=True)
+
+    with pytest.raises(ValueError):
+        bus.handle(commands.RedactResume(uuid="x", idempotency_key="key"))
+
+    assert not bus.uow.processed_messages.contains("key")
+
+
+def test_bus_logs_a_failed_command_by_default():
+    bus = bus_failing_with(ValueError(), raise_errors=False)
+
+    bus.handle(commands.RedactResume(uuid="x", idempotency_key="key"))
+
+    assert not bus.uow.processed_messages.contains("key")
@@ -0,0 +1,279 @@
+import os
+
+import fitz
+import pytest
+
+from resume.domain import geometry, model
+from resume.domain.redaction import (
+    Bottom10Percent,
+    ImageRedactor,
+    LinkRedactor,
+    MetadataRedactor,
+    OutputOptimizer,
+    Top30Percent,
+    iter_sentence_chunks,
+    punkt_tokenizer,
+)
+
+RESUME_PDF = os.path.join(os.path.dirname(__file__), "..", "..", "resume.pdf")
+
+
+def resume_bytes() -> bytes:
+    with open(RESUME_PDF, "rb") as f:
+        return f.read()
+
+
+def reshaped(mediabox=None, rotation=0) -> bytes:
+    with fitz.Document(stream=resume_bytes(), filetype="pdf") as pdf:
+        page = pdf[0]
+        if mediabox is not None:
+            pdf.xref_set_key(page.xref, "MediaBox", mediabox)
+        page.set_rotation(rotation)
+        return pdf.tobytes()
+
+
+def is_visible(tc, visible) -> bool:
+    return any(
+        other.text == tc.text
+        and abs(other.x0 - tc.x0) < 1
+        and abs(other.y0 - tc.y0) < 1
+        for other in visible
+    )
+
+
+@pytest.mark.parametrize("rotation", [0, 90, 180, 270])
+@pytest.mark.parametrize("mediabox", [None, "[0 -100 612 692]"])
+def test_redacted_text_coordinates_are_still_visible(mediabox, rotation):
+    bytes = reshaped(mediabox, rotation)
+    result = model.redact_pdf(
+        bytes,
+        [Top30Percent(), Bottom10Percent(), LinkRedactor(), ImageRedactor()],
+        return_result=True,
+    )
+
+    kept = geometry.filter_redacted_text_coordinates(
+        model.find_text_coordinates(bytes), result.redacted_rects[0]
+    )
+    visible = model.find_text_coordinates(result.bytes)
+
+    assert kept
+    assert [tc.text for tc in kept if not is_visible(tc, visible)] == []
+    # the filter errs on the side of dropping, but not by much
+    assert len(kept) >= 0.9 * len(visible)
+
+
+def long_document(copies: int = 6) -> bytes:
+    with fitz.Document(stream=resume_bytes(), filetype="pdf") as resume:
+        pdf = fitz.Document()
+        for _ in range(copies):
+            pdf.insert_pdf(resume)
+    for page in pdf:
+        # to a page of another shard
+        page.insert_link(
+            {
+                "kind": fitz.LINK_GOTO,
+                "from": fitz.Rect(100, 300, 200, 320),
+                "page": (page.number + 3) % pdf.page_count,
+                "to": fitz.Point(0, 0),
+            }
+        )
+    pdf.set_toc([[1, f"Page {number + 1}", number + 1] for number in range(copies)])
+    pdf.set_metadata({"author": "Jane Doe"})
+    return pdf.tobytes()
+
+
+def strategies():
+    return [
+        Top30Percent(),
+        Bottom10Percent(),
+        ImageRedactor(),
+        LinkRedactor(),
+        MetadataRedactor(),
+        OutputOptimizer(),
+    ]
+
+
+@pytest.mark.parametrize("strategies", [strategies, lambda: [Top30Percent()]])
+def test_sharded_redaction_matches_serial_redaction(strategies):
+    bytes = long_document()
+
+    serial = model.redact_pdf(bytes, strategies(), return_result=True)
+    sharded = model.redact_pdf(
+        bytes,
+        strategies(),
+        return_result=True,
+        parallel=True,
+        workers=3,
+        min_pages_per_shard=2,
+    )
+
+    assert sharded.text == serial.text
+    assert sharded.redacted_rects == serial.redacted_rects
+    assert sharded.page_sizes == serial.page_sizes
+    assert sharded.pages_skipped == serial.pages_skipped
+    assert sharded.saves_skipped == serial.saves_skipped
+    with fitz.Document(stream=serial.bytes, filetype="pdf") as expected:
+        with fitz.Document(stream=sharded.bytes, filetype="pdf") as pdf:
+            assert pdf.page_count == expected.page_count
+            assert pdf.get_toc() == expected.get_toc()
+            assert pdf.metadata == expected.metadata
+            assert [
+                [(link["from"], link["page"]) for link in page.get_links()]
+                for page in pdf
+            ] == [
+                [(link["from"], link["page"]) for link in page.get_links()]
+                for page in expected
+            ]
+
+
+PAGES = [
+    "Jane Doe worked at Example Corp. in Berlin. She led the data team of "
+    "Acme Inc. for six years. Before that she studied at the University of "
+    "Oxford. Her thesis was supervised by John Smith.",
+    "",
+    "References are available from Mary Major at Globex. Contact details on "
+    "request. Languages: English, German and French.",
+]
+
+
+def sentences_of(pages):
+    return [sentence for page in pages for sentence in punkt_tokenizer().tokenize(page)]
+
+
+def chunks_of(pages, max_chars, overlap_sentences=1):
+    return list(iter_sentence_chunks(pages, max_chars, overlap_sentences))
+
+
+@pytest.mark.parametrize("max_chars", [1, 40, 80, 10_000])
+def test_sentence_chunks_never_split_words(max_chars):
+    text = " ".join(page for page in PAGES if page)
+    sentences = sentences_of(PAGES)
+
+    chunks = [chunk for _, chunk, _ in chunks_of(PAGES, max_chars) if chunk]
+
+    # whole sentences, in order, so every word and entity is left intact
+    for chunk in chunks:
+        assert chunk in text
+        assert chunk.startswith(tuple(sentences))
+        assert chunk.endswith(tuple(sentences))
+    assert all(any(sentence in chunk for chunk in chunks) for sentence in sentences)
+
+
+def test_sentence_chunks_overlap_across_chunk_and_page_boundaries():
+    sentences = sentences_of(PAGES)
+
+    chunks = [chunk for _, chunk, _ in chunks_of(PAGES, 40)]
+
+    # an entity running from one sentence into the next is tagged whole
+    for first, second in zip(sentences, sentences[1:]):
+        assert any(f"{first} {second}" in chunk for chunk in chunks)
+
+
+def test_sentence_chunks_without_overlap_repeat_nothing():
+    chunks = [chunk for _, chunk, _ in chunks_of(PAGES, 40, overlap_sentences=0)]
+
+    assert " ".join(chunk for chunk in chunks if chunk) == " ".join(
+        page for page in PAGES if page
+    )
+
+
+def test_sentence_chunks_mark_the_end_of_every_page():
+    chunks = chunks_of(PAGES, 60)
+
+    assert [page for page, _, done in chunks if done] == [0, 1, 2]
+    assert [page for page, _, _ in chunks] == sorted(page for page, _, _ in chunks)
+    # the empty page has nothing new to tag
+    assert [chunk for page, chunk, _ in chunks if page == 1] == [""]
+
+
+def plain_document(pages=2) -> bytes:
+    with fitz.Document() as pdf:
+        for _ in range(pages):
+            pdf.new_page().insert_text((72, 72), "Jane Doe")
+        return pdf.tobytes()
+
+
+@pytest.mark.parametrize("strategy", [ImageRedactor, LinkRedactor])
+def test_pages_without_anything_to_redact_are_skipped(strategy):
+    bytes = plain_document()
+    redactor = strategy()
+
+    assert redactor.apply(bytes) is bytes
+    assert redactor.pages_skipped == 2
+    assert redactor.save_skipped
+    assert redactor.redacted_rects == [[], []]
+
+
+def test_only_pages_with_images_are_redacted():
+    with fitz.Document(stream=resume_bytes(), filetype="pdf") as resume:
+        pdf = fitz.Document()
+        pdf.insert_pdf(resume)
+        pdf.new_page().insert_text((72, 72), "Jane Doe")
+        bytes = pdf.tobytes()
+    redactor = ImageRedactor()
+
+    redactor.apply(bytes)
+
+    assert redactor.pages_skipped == 1
+    assert not redactor.save_skipped
+    assert redactor.redacted_rects[0] and not redactor.redacted_rects[1]
+
+
+XMP = """<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>
+<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF
+ xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"><rdf:Description
+ xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:creator>Jane Xmp</dc:creator>
+</rdf:Description></rdf:RDF></x:xmpmeta><?xpacket end="w"?>"""
+
+
+def test_metadata_and_xmp_are_removed():
+    with fitz.Document(stream=plain_document(), filetype="pdf") as pdf:
+        pdf.set_metadata({"author": "Jane Info", "title": "Jane Doe - Resume"})
+        pdf.set_xml_metadata(XMP)
+        bytes = pdf.tobytes()
+
+    redacted = MetadataRedactor().apply(bytes)
+
+    with fitz.Document(stream=redacted, filetype="pdf") as pdf:
+        assert not any(
+            value
+            for key, value in pdf.metadata.items()
+            if key not in ("format", "encryption")
+        )
+        assert pdf.xref_xml_metadata() == 0
+    # the old objects are gone from the file, not just unreferenced
+    assert b"Jane Info" not in redacted
+    assert b"Jane Xmp" not in redacted
+
+
+def test_documents_without_metadata_are_not_saved_again():
+    with fitz.Document(stream=plain_document(), filetype="pdf") as pdf:
+        pdf.set_metadata({})
+        bytes = pdf.tobytes()
+    redactor = MetadataRedactor()
+
+    assert redactor.apply(bytes) is bytes
+    assert redactor.save_skipped
+
+
+def page_texts(bytes) -> list:
+    with fitz.Document(stream=bytes, filetype="pdf") as pdf:
+        return [page.get_text("words") for page in pdf]
+
+
+def test_optimized_output_renders_the_same_text():
+    bytes = model.redact_pdf(resume_bytes(), [Top30Percent(), ImageRedactor()])
+    optimizer = OutputOptimizer()
+
+    optimized = optimizer.apply(bytes)
+
+    assert 0 < optimizer.bytes_saved == len(bytes) - len(optimized)
+    assert page_texts(optimized) == page_texts(bytes)
+
+
+def test_optimizer_keeps_the_input_when_it_is_not_smaller():
+    bytes = OutputOptimizer().apply(plain_document())
+    optimizer = OutputOptimizer()
+
+    assert optimizer.apply(bytes) is bytes
+    assert optimizer.bytes_saved == 0
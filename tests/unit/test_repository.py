@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+from sqlalchemy.orm import Session, clear_mappers
+
+from resume.adapters import orm, repository
+from resume.domain import commands
+from resume.service_layer import messagebus, unit_of_work
+
+LARGE_COLUMNS = ["text", "redacted_text", "tsv", "redacted_tsv"]
+
+
+@pytest.fixture
+def session():
+    orm.start_mappers()
+    yield Session()
+    clear_mappers()
+
+
+def emitted_select(session, load) -> str:
+    # the statements are captured and answered with an empty result, so no
+    # database is needed; they are compiled as Postgres would receive them
+    statements = []
+
+    @event.listens_for(session, "do_orm_execute")
+    def capture(orm_execute_state):
+        statements.append(orm_execute_state.statement)
+        return IteratorResult(SimpleResultMetaData([]), iter([]))
+
+    load(repository.SqlAlchemyRepository(session))
+    [statement] = statements
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def selected_columns(sql: str) -> list:
+    columns = sql.split("SELECT", 1)[1].split("FROM", 1)[0]
+    return [column.split(" AS ")[0].strip() for column in columns.split(",")]
+
+
+def test_get_by_uuid_with_fields_selects_only_those_columns(session):
+    sql = emitted_select(
+        session,
+        lambda repo: repo.get_by_uuid(
+            "some-uuid", fields=["link", "redaction_version", "skip_redaction"]
+        ),
+    )
+
+    assert set(selected_columns(sql)) == {
+        "resume.id",
+        "resume.link",
+        "resume.redaction_version",
+        "resume.skip_redaction",
+    }
+    for column in LARGE_COLUMNS:
+        assert f"resume.{column}" not in selected_columns(sql)
+
+
+def test_get_by_uuid_defers_large_text_columns(session):
+    sql = emitted_select(session, lambda repo: repo.get_by_uuid("some-uuid"))
+
+    assert "resume.link" in selected_columns(sql)
+    for column in LARGE_COLUMNS:
+        assert f"resume.{column}" not in selected_columns(sql)
+
+
+class Captured(Exception):
+    def __init__(self, statement):
+        self.statement = statement
+
+
+def emitted_processed_messages_sql(session, call):
+    # stops at the first statement, before anything reads its result
+    @event.listens_for(session, "do_orm_execute")
+    def capture(orm_execute_state):
+        raise Captured(orm_execute_state.statement)
+
+    with pytest.raises(Captured) as captured:
+        call(repository.SqlAlchemyProcessedMessageRepository(session))
+    return captured.value.statement.compile(dialect=postgresql.dialect())
+
+
+def test_prune_deletes_keys_older_than_the_retention(session):
+    compiled = emitted_processed_messages_sql(
+        session, lambda processed: processed.prune(3600)
+    )
+
+    assert str(compiled).startswith(
+        "DELETE FROM processed_messages "
+        "WHERE processed_messages.processed_at < now() - "
+    )
+    assert list(compiled.params.values()) == [timedelta(seconds=3600)]
+
+
+def test_add_ignores_a_key_already_processed(session):
+    compiled = emitted_processed_messages_sql(
+        session, lambda processed: processed.add("some-key")
+    )
+
+    assert str(compiled).endswith("ON CONFLICT (key) DO NOTHING")
+
+
+def test_in_memory_prune_forgets_only_old_keys():
+    now = [1000.0]
+    processed = repository.InMemoryProcessedMessageRepository(clock=lambda: now[0])
+    processed.add("old")
+    now[0] += 50
+    processed.add("new")
+    # a redelivery doesn't make a key younger
+    processed.add("old")
+    now[0] += 20
+
+    assert processed.prune(60) == 1
+    assert not processed.contains("old")
+    assert processed.contains("new")
+
+
+def test_bus_skips_a_command_whose_key_was_processed():
+    handled = []
+    bus = messagebus.MessageBus(
+        uow=unit_of_work.InMemoryUnitOfWork(),
+        event_handlers={},
+        command_handlers={commands.RedactResume: handled.append},
+    )
+
+    bus.handle(commands.RedactResume(uuid="a", idempotency_key="redact:a"))
+    bus.handle(commands.RedactResume(uuid="a", idempotency_key="redact:a"))
+    bus.handle(commands.RedactResume(uuid="b", idempotency_key="redact:b"))
+
+    assert [cmd.uuid for cmd in handled] == ["a", "b"]
+    assert bus.uow.processed_messages.contains("redact:a")
@@ -0,0 +1,85 @@
+from resume.adapters.admission import InMemoryAdmission
+from resume.adapters.file_store import InMemoryFileStore
+from resume.domain import commands, model
+from resume.service_layer import handlers, unit_of_work
+from resume.service_layer.scheduler import RedactionScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_backfill_cannot_take_the_reserved_slots():
+    admission = InMemoryAdmission(capacity=2, reserved_interactive=1)
+
+    assert admission.acquire(commands.BACKFILL) is not None
+    assert admission.acquire(commands.BACKFILL) is None
+    assert admission.acquire(commands.INTERACTIVE) is not None
+
+
+def test_backfill_is_rate_limited():
+    clock = FakeClock()
+    scheduler = RedactionScheduler(
+        InMemoryAdmission(capacity=4, backfill_per_minute=60, clock=clock)
+    )
+
+    with scheduler.slot(commands.BACKFILL):
+        pass
+    assert not scheduler.backfill_ready()
+
+    clock.now += 1
+    assert scheduler.backfill_ready()
+
+
+def test_capacity_wait_has_no_timeout():
+    # a backfill blocked by slots only waits for a release, it doesn't poll
+    admission = InMemoryAdmission(capacity=2, reserved_interactive=1)
+    admission.acquire(commands.BACKFILL)
+
+    assert admission.retry_in(commands.BACKFILL) is None
+
+
+def test_metrics_count_admissions_by_priority():
+    scheduler = RedactionScheduler(InMemoryAdmission(capacity=2))
+
+    with scheduler.slot(commands.INTERACTIVE):
+        metrics = scheduler.metrics()
+
+    assert metrics[commands.INTERACTIVE]["running"] == 1
+    assert metrics["slots"]["running"] == 1
+    assert scheduler.metrics()[commands.INTERACTIVE]["admitted"] == 1
+
+
+class PrefetchingFileStore(InMemoryFileStore):
+    def __init__(self):
+        super().__init__()
+        self.prefetched = []
+
+    def prefetch(self, links):
+        self.prefetched.append(list(links))
+
+
+def test_kickoff_claims_a_batch_of_backfill_resumes():
+    uow = unit_of_work.InMemoryUnitOfWork()
+    for number in range(3):
+        uow.resumes.add(model.Resume(uuid=f"uuid-{number}", link=f"{number}.pdf"))
+    file_store = PrefetchingFileStore()
+
+    handlers.kickoff_resume_redaction(
+        commands.KickoffResumeRedaction(batch_size=2),
+        uow=uow,
+        file_store=file_store,
+        scheduler=RedactionScheduler(InMemoryAdmission(capacity=2)),
+    )
+
+    queued = list(uow.collect_new_events())
+    assert [cmd.priority for cmd in queued] == [commands.BACKFILL] * 2
+    claimed = [uow.resumes.get_by_uuid(cmd.uuid) for cmd in queued]
+    assert all(resume.skip_redaction for resume in claimed)
+    # the whole batch in one go
+    [prefetched] = file_store.prefetched
+    assert sorted(prefetched) == sorted(resume.link for resume in claimed)
@@ -0,0 +1,80 @@
+import os
+import time
+
+import fitz
+import pytest
+
+from resume.config import get_pdf_limits_config
+from resume.domain import model
+from resume.service_layer import supervisor
+
+
+def limits(**kwargs):
+    return dict(get_pdf_limits_config(), supervise=True, **kwargs)
+
+
+def child_pid():
+    return os.getpid()
+
+
+def fail():
+    raise ValueError("bad page")
+
+
+def stage_marker():
+    return getattr(supervisor, "STAGE_MARKER", None)
+
+
+def hang():
+    time.sleep(60)
+
+
+def test_stage_runs_in_a_child_process():
+    assert supervisor.run_stage("parse", child_pid, limits=limits()) != os.getpid()
+
+
+def test_stage_exceptions_are_reraised():
+    with pytest.raises(ValueError, match="bad page"):
+        supervisor.run_stage("parse", fail, limits=limits())
+
+
+def test_stage_is_killed_at_its_deadline():
+    with pytest.raises(supervisor.DeadlineExceeded):
+        supervisor.run_stage(
+            "parse", hang, limits=limits(default_deadline=0.5, deadlines={})
+        )
+
+
+def test_stage_is_not_forked_off_the_caller(monkeypatch):
+    # so it can't inherit a lock one of the caller's threads holds
+    monkeypatch.setattr(supervisor, "STAGE_MARKER", "set in the caller", raising=False)
+
+    assert supervisor.run_stage("parse", stage_marker, limits=limits()) is None
+
+
+def pdf_bytes(pages=1, text="Jane Doe") -> bytes:
+    with fitz.Document() as pdf:
+        for _ in range(pages):
+            pdf.new_page().insert_text((72, 72), text)
+        return pdf.tobytes()
+
+
+def test_check_pdf_limits_rejects_too_many_pages():
+    with pytest.raises(model.ResourceLimitExceeded, match="3 pages"):
+        supervisor.check_pdf_limits(pdf_bytes(pages=3), limits(max_pages=2))
+
+
+def test_check_pdf_limits_rejects_too_many_bytes():
+    bytes = pdf_bytes()
+
+    with pytest.raises(model.ResourceLimitExceeded, match="bytes exceeds"):
+        supervisor.check_pdf_limits(bytes, limits(max_bytes=len(bytes) - 1))
+
+
+def test_characters_are_counted_when_parsed():
+    bytes = pdf_bytes(pages=2, text="x" * 80)
+    supervisor.check_pdf_limits(bytes, limits(max_chars_per_page=10))
+
+    with pytest.raises(model.ResourceLimitExceeded, match="on page 0"):
+        model.Resume.from_bytes(bytes, max_chars_per_page=10)
+    assert model.Resume.from_bytes(bytes, max_chars_per_page=100).text
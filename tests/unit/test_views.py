@@ -0,0 +1,239 @@
+from types import SimpleNamespace
+
+import pytest
+from werkzeug.http import parse_etags
+
+from resume import in_memory_views, views
+from resume.adapters.cache import LRUCache
+from resume.domain import model
+from resume.service_layer import unit_of_work
+
+
+def resume(**kwargs):
+    return dict(
+        width=600,
+        height=800,
+        text_coordinates=[dict(text="python", x0=30, x1=130, y0=700, y1=760)],
+        **kwargs,
+    )
+
+
+def test_scales_against_the_media_box_before_previews_are_rendered():
+    scaled = views.scale_text_coordinates(resume(), 300)
+
+    assert (scaled["width"], scaled["height"]) == (300, 400)
+    assert scaled["text_coordinates"] == [
+        dict(text="python", x0=15, x1=65, y0=20, y1=50)
+    ]
+
+
+def test_scales_against_the_rendered_page():
+    # cropped by 30 points on the left and 40 at the top
+    page = dict(width=500, height=700, matrix=[1, 0, 0, -1, -30, 760])
+
+    scaled = views.scale_text_coordinates(resume(preview_page=page), 1000)
+
+    assert (scaled["width"], scaled["height"]) == (1000, 1400)
+    assert scaled["text_coordinates"] == [
+        dict(text="python", x0=0, x1=200, y0=0, y1=120)
+    ]
+
+
+def test_scales_against_the_rotated_page():
+    # pdfminer already turns the page, only the crop box is rotated here
+    page = dict(width=800, height=600, matrix=[1, 0, 0, -1, 0, 600])
+    rotated = resume(preview_page=page)
+    rotated["text_coordinates"][0].update(y0=500, y1=560)
+
+    scaled = views.scale_text_coordinates(rotated, 400)
+
+    assert (scaled["width"], scaled["height"]) == (400, 300)
+    assert scaled["text_coordinates"] == [
+        dict(text="python", x0=15, x1=65, y0=20, y1=50)
+    ]
+
+
+class Resumes:
+    """Stands in for get_resume, counting the database reads."""
+
+    def __init__(self, **resumes):
+        self.resumes = resumes
+        self.loads = 0
+
+    def get_resume(self, uow, uuid, keywords=None):
+        self.loads += 1
+        resume = self.resumes.get(uuid)
+        return None if resume is None else dict(resume, keywords=keywords)
+
+
+@pytest.fixture
+def resumes(monkeypatch):
+    resumes = Resumes(some_uuid=resume())
+    monkeypatch.setattr(views, "get_resume", resumes.get_resume)
+    return resumes
+
+
+def test_cache_hit_does_not_read_the_database(resumes):
+    cache = LRUCache()
+
+    first = views.get_cached_resume(None, cache, "some_uuid", keywords="python")
+    second = views.get_cached_resume(None, cache, "some_uuid", keywords="Python")
+
+    assert resumes.loads == 1
+    assert second == first
+
+
+def test_cache_miss_per_keywords(resumes):
+    cache = LRUCache()
+
+    views.get_cached_resume(None, cache, "some_uuid")
+    views.get_cached_resume(None, cache, "some_uuid", keywords="")
+    views.get_cached_resume(None, cache, "some_uuid", keywords="python")
+
+    assert resumes.loads == 3
+
+
+def test_missing_resumes_are_not_cached(resumes):
+    cache = LRUCache()
+
+    assert views.get_cached_resume(None, cache, "other_uuid") is None
+    assert views.get_cached_resume(None, cache, "other_uuid") is None
+    assert resumes.loads == 2
+
+
+def test_invalidation_reloads_and_changes_the_etag(resumes):
+    cache = LRUCache()
+    before = views.get_cached_resume(None, cache, "some_uuid")
+
+    resumes.resumes["some_uuid"] = dict(resume(), width=612)
+    cache.invalidate("some_uuid")
+    after = views.get_cached_resume(None, cache, "some_uuid")
+
+    assert resumes.loads == 2
+    assert after["data"]["width"] == 612
+    assert after["etag"] != before["etag"]
+
+
+def test_a_load_overlapping_an_invalidation_is_not_stored(resumes):
+    cache = LRUCache()
+
+    def load_while_written():
+        cache.invalidate("some_uuid")
+        return dict(etag="stale", data={})
+
+    assert cache.get_or_load("some_uuid", "-", load_while_written)["etag"] == "stale"
+    assert cache.get("some_uuid", "-") is None
+
+
+def test_etag_revalidates_until_invalidated(resumes):
+    cache = LRUCache()
+    etag = views.resume_etag(views.get_cached_resume(None, cache, "some_uuid"))
+    if_none_match = parse_etags(f'"{etag}"')
+
+    # a 304 as long as the entry is cached
+    cached = views.get_cached_resume(None, cache, "some_uuid")
+    assert if_none_match.contains(views.resume_etag(cached))
+
+    resumes.resumes["some_uuid"] = dict(resume(), width=612)
+    cache.invalidate("some_uuid")
+    cached = views.get_cached_resume(None, cache, "some_uuid")
+    assert not if_none_match.contains(views.resume_etag(cached))
+
+
+def test_etag_per_representation(resumes):
+    cached = views.get_cached_resume(None, LRUCache(), "some_uuid")
+
+    etags = {
+        views.resume_etag(cached),
+        views.resume_etag(cached, preview_width=640),
+        views.resume_etag(cached, compact=True),
+        views.resume_etag(cached, preview_width=640, compact=True),
+    }
+
+    assert len(etags) == 4
+
+
+def test_search_cursor_round_trips():
+    cursor = views.encode_search_cursor(0.25, 42)
+
+    assert views.decode_search_cursor(cursor) == (0.25, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bnVsbA==", "WzEsIDIsIDNd", "e30="])
+def test_invalid_search_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid search cursor"):
+        views.decode_search_cursor(cursor)
+
+
+class SearchSession:
+    """Records the search SQL, answering it with the given rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def execute(self, sql, params):
+        self.statements.append((sql, params))
+        rows = self.rows if len(self.statements) == 1 else []
+        return SimpleNamespace(all=lambda: rows)
+
+
+class SearchUnitOfWork:
+    def __init__(self, rows=()):
+        self.session = SearchSession(list(rows))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def test_search_ranks_a_bounded_candidate_set():
+    uow = SearchUnitOfWork()
+
+    views.search_resumes(uow, "python developer", max_candidates=500)
+
+    [(sql, params)] = uow.session.statements
+    candidates, ranked = sql.split('"matches" AS', 1)
+    assert "LIMIT :max_candidates" in candidates
+    assert "ts_rank_cd" not in candidates
+    assert "ts_rank_cd" in ranked
+    assert params["max_candidates"] == 500
+
+
+def test_search_pages_with_the_last_row_as_cursor():
+    rows = [
+        dict(id=id, uuid=f"uuid-{id}", link="", width=1, height=1, rank=0.5)
+        for id in (9, 8)
+    ]
+    uow = SearchUnitOfWork(rows)
+
+    page = views.search_resumes(uow, "python", limit=2)
+    views.search_resumes(uow, "python", limit=2, cursor=page["next_cursor"])
+
+    assert [resume["uuid"] for resume in page["data"]] == ["uuid-9", "uuid-8"]
+    sql, params = uow.session.statements[-1]
+    assert '("matches".rank, "matches".id) < (:cursor_rank, :cursor_id)' in sql
+    assert (params["cursor_rank"], params["cursor_id"]) == (0.5, 8)
+
+
+def test_in_memory_search_pages_through_the_newest_candidates():
+    uow = unit_of_work.InMemoryUnitOfWork()
+    for number in range(10):
+        uow.resumes.add(
+            model.Resume(uuid=f"uuid-{number}", text="python " * (number % 3 + 1))
+        )
+
+    found, cursor = [], None
+    while True:
+        page = in_memory_views.search_resumes(
+            uow, "python", limit=3, cursor=cursor, max_candidates=6
+        )
+        found += [resume["uuid"] for resume in page["data"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(found) == sorted(f"uuid-{number}" for number in range(4, 10))
+    assert len(found) == len(set(found))